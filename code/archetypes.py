@@ -0,0 +1,48 @@
+from settings import * 
+
+# field: (type, default), times in milliseconds
+ARCHETYPE_FIELDS = {
+    'speed': ((int, float), 0),
+    'lifetime': ((int, float), 0),
+    'death_duration': ((int, float), 0),
+    'animation_speed': ((int, float), 0),
+    'turn_interval': ((int, float), 0),
+    'cooldown': ((int, float), 0),
+    'distance': ((int, float), 0),
+    'hitbox': (list, (0, 0)),
+}
+
+class Archetype:
+    __slots__ = ('name',) + tuple(ARCHETYPE_FIELDS)
+
+    def __init__(self, name, *values):
+        # constants shared by every entity of one type, in ARCHETYPE_FIELDS order
+        self.name = name
+        for field, value in zip(ARCHETYPE_FIELDS, values):
+            setattr(self, field, value)
+
+def validate_archetypes(data, source):
+    # raises ValueError naming the file, archetype and field that is wrong
+    if not isinstance(data, dict):
+        raise ValueError(f'{source}: expected an object of archetypes')
+    archetypes = {}
+    for name, fields in data.items():
+        if not isinstance(fields, dict):
+            raise ValueError(f'{source}: {name} must be an object')
+        unknown = set(fields) - set(ARCHETYPE_FIELDS)
+        if unknown:
+            raise ValueError(f'{source}: {name} has unknown fields {", ".join(sorted(unknown))}')
+        values = []
+        for field, (kind, default) in ARCHETYPE_FIELDS.items():
+            value = fields.get(field, default)
+            if field in fields and (not isinstance(value, kind) or isinstance(value, bool)):
+                raise ValueError(f'{source}: {name}.{field} has the wrong type')
+            if field == 'hitbox':
+                if len(value) != 2 or not all(isinstance(part, (int, float)) for part in value):
+                    raise ValueError(f'{source}: {name}.hitbox must be two numbers')
+                value = tuple(value)
+            elif value < 0:
+                raise ValueError(f'{source}: {name}.{field} must not be negative')
+            values.append(value)
+        archetypes[name] = tuple(values)
+    return archetypes
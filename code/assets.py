@@ -0,0 +1,78 @@
+from settings import * 
+from time import perf_counter
+
+class AssetRegistry:
+    def __init__(self):
+        # every image and sound is loaded once and shared by reference
+        self.images = {}
+        self.sounds = {}
+        self.atlases = {}
+        self.bundled = {}
+
+        # per group: [assets, load seconds, bytes]
+        self.stats = {}
+
+    def record(self, group, start, size, count = 1):
+        stats = self.stats.setdefault(group, [0, 0.0, 0])
+        stats[0] += count
+        stats[1] += perf_counter() - start
+        stats[2] += size
+
+    def add_bundle(self, images):
+        # decoded surfaces from the baked bundle, used instead of reading the files
+        self.bundled.update(images)
+
+    def load(self, path):
+        if path in self.bundled:
+            return self.bundled.pop(path)
+        return pygame.image.load(path).convert_alpha()
+
+    def image(self, path, group = 'images'):
+        if path not in self.images:
+            start = perf_counter()
+            surf = self.load(path)
+            self.images[path] = surf
+            self.record(group, start, surf.get_pitch() * surf.get_height())
+        return self.images[path]
+
+    def sound(self, path, group = 'sounds'):
+        if path not in self.sounds:
+            start = perf_counter()
+            sound = pygame.mixer.Sound(path)
+            frequency, size, channels = pygame.mixer.get_init()
+            self.sounds[path] = sound
+            self.record(group, start, int(sound.get_length() * frequency) * channels * abs(size) // 8)
+        return self.sounds[path]
+
+    def frame_paths(self, folder):
+        _, _, file_names = next(walk(folder))
+        return [join(folder, file_name) for file_name in sorted(file_names, key = lambda name: int(name.split('.')[0]))]
+
+    def atlas(self, group, folders):
+        # packs the numbered frames of each folder into one row of a shared surface
+        # and returns {name: [subsurfaces]}
+        if group not in self.atlases:
+            start = perf_counter()
+            rows = {name: [self.load(path) for path in self.frame_paths(folder)] for name, folder in folders.items()}
+            width = max(sum(surf.get_width() for surf in row) for row in rows.values())
+            height = sum(max(surf.get_height() for surf in row) for row in rows.values())
+            sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+
+            frames, y = {}, 0
+            for name, row in rows.items():
+                frames[name], x = [], 0
+                for surf in row:
+                    sheet.blit(surf, (x, y))
+                    frames[name].append(sheet.subsurface((x, y), surf.get_size()))
+                    x += surf.get_width()
+                y += max(surf.get_height() for surf in row)
+
+            self.atlases[group] = frames
+            self.record(group, start, sheet.get_pitch() * sheet.get_height(), sum(len(row) for row in rows.values()))
+        return self.atlases[group]
+
+    def report(self):
+        return [f'{group}: {count} assets, {seconds * 1000:.1f} ms, {size / 1024:.0f} KiB' 
+                for group, (count, seconds, size) in self.stats.items()]
+
+assets = AssetRegistry()
@@ -0,0 +1,87 @@
+from settings import * 
+from assets import assets
+from concurrent.futures import ThreadPoolExecutor
+from os.path import exists
+
+class AudioManager:
+    def __init__(self):
+        # long narrations are decoded off the game thread, one at a time
+        self.loader = ThreadPoolExecutor(max_workers = 1)
+        self.narrations = {}
+        self.pending = None
+        self.playing = None
+
+    def find(self, paths):
+        return next((path for path in paths if exists(path)), None)
+
+    def sfx(self, path, volume = None):
+        # short effects are decoded up front and shared through the asset registry
+        sound = assets.sound(path)
+        if volume is not None:
+            sound.set_volume(volume)
+        return sound
+
+    def play_music(self, paths, volume):
+        # background music is streamed instead of decoded into memory
+        path = self.find(paths)
+        if not path:
+            print(f'Error loading background music: none of {paths} exist')
+            return
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(volume)
+        pygame.mixer.music.play(loops = -1)
+        print(f'Streaming background music from {path}')
+
+    def stop_music(self):
+        pygame.mixer.music.stop()
+
+    def decode(self, path):
+        try:
+            return pygame.mixer.Sound(path)
+        except pygame.error as e:
+            print(f'Error loading narration {path}: {e}')
+            return None
+
+    def prefetch(self, key, paths):
+        if key not in self.narrations:
+            path = self.find(paths)
+            self.narrations[key] = self.loader.submit(self.decode, path) if path else None
+
+    def play_narration(self, key, paths, volume = 1):
+        # plays as soon as the decode has finished, see update
+        self.stop_narration()
+        self.prefetch(key, paths)
+        self.pending = (key, volume)
+        self.update()
+
+    def update(self):
+        if self.pending:
+            key, volume = self.pending
+            narration = self.narrations.get(key)
+            if narration is None:
+                self.pending = None
+            elif narration.done():
+                self.pending = None
+                sound = narration.result()
+                if sound:
+                    sound.set_volume(volume)
+                    sound.play()
+                    self.playing = key
+                    print(f'Playing {key} narration')
+
+    def stop_narration(self):
+        # a narration is only heard once, its decoded data is released when it stops
+        if self.pending:
+            narration = self.narrations.pop(self.pending[0], None)
+            if narration:
+                narration.cancel()
+            self.pending = None
+        if self.playing:
+            sound = self.narrations.pop(self.playing).result()
+            sound.stop()
+            self.playing = None
+
+    def shutdown(self):
+        self.stop_narration()
+        self.stop_music()
+        self.loader.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,16 @@
+# offline bake step, run from the project root: python code/bake.py
+from os import environ
+environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from settings import * 
+from bundle import bake, BUNDLE_PATH
+from config import compile_config, CONFIG_PATH
+
+if __name__ == '__main__':
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    image_count, size = bake(join('data', 'maps', 'world.tmx'))
+    print(f'Baked {image_count} images, {size / 1024:.0f} KiB into {BUNDLE_PATH}')
+    archetype_count, scroll_count, wave_count = compile_config()
+    print(f'Compiled {archetype_count} archetypes, {scroll_count} scrolls and {wave_count} waves into {CONFIG_PATH}')
+    pygame.quit()
@@ -0,0 +1,189 @@
+from settings import *
+from timing import game_time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class EntityStore:
+    def __init__(self, capacity = 64):
+        # structure of arrays, row i belongs to sprites[i] and sprite.slot == i
+        self.sprites = []
+        self.pos = np.zeros((capacity, 2))
+        self.direction = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.expires = np.zeros(capacity)
+        self.phase = np.zeros(capacity)
+        self.rate = np.zeros(capacity)
+        self.frame_count = np.ones(capacity, dtype = np.int64)
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def grow(self):
+        for name in ('pos', 'direction', 'size', 'speed', 'expires', 'phase', 'rate', 'frame_count'):
+            column = getattr(self, name)
+            grown = np.ones((len(column) * 2,) + column.shape[1:], dtype = column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def add(self, sprite, pos, direction, size, speed, expires = 0, phase = 0, rate = 0, frame_count = 1):
+        if len(self.sprites) == len(self.pos):
+            self.grow()
+        slot = len(self.sprites)
+        self.sprites.append(sprite)
+        self.pos[slot] = pos
+        self.direction[slot] = direction
+        self.size[slot] = size
+        self.speed[slot] = speed
+        self.expires[slot] = expires
+        self.phase[slot] = phase
+        self.rate[slot] = rate
+        self.frame_count[slot] = frame_count
+        sprite.store, sprite.slot = self, slot
+
+    def remove(self, sprite):
+        # the last row moves into the freed slot
+        slot, last = sprite.slot, len(self.sprites) - 1
+        moved = self.sprites.pop()
+        if slot != last:
+            self.sprites[slot] = moved
+            moved.slot = slot
+            for column in (self.pos, self.direction, self.size, self.speed, self.expires, self.phase, self.rate, self.frame_count):
+                column[slot] = column[last]
+        sprite.store, sprite.slot = None, None
+
+class EntityBatch:
+    available = np is not None
+
+    def __init__(self, player, collision_grid, flow_field = None):
+        # enemies and bullets moved as arrays instead of one sprite update at a time
+        self.player = player
+        self.collision_grid = collision_grid
+        self.flow_field = flow_field
+        self.field_version = None
+        self.field_targets = None
+        self.enemies = EntityStore()
+        self.bullets = EntityStore()
+
+        # broad phase, summed-area table over a fine grid of the static obstacles in the collision
+        # grid, any box is tested against it with four lookups, it is built again when the grid
+        # changes, so it only covers the loaded regions of a streamed world
+        self.cell_size = BATCH_CELL_SIZE
+        self.grid_version = None
+        self.build_obstacles()
+
+    def build_obstacles(self):
+        self.grid_version = self.collision_grid.version
+        obstacles = [sprite.rect for sprite in self.collision_grid.order] or [pygame.FRect()]
+        self.origin = (np.array((min(rect.left for rect in obstacles), min(rect.top for rect in obstacles))) // self.cell_size).astype(np.int64)
+        end = (np.array((max(rect.right for rect in obstacles), max(rect.bottom for rect in obstacles))) // self.cell_size).astype(np.int64)
+        columns, rows = (end - self.origin + 1).tolist()
+        blocked = np.zeros((rows, columns), dtype = np.int32)
+        for rect in obstacles:
+            left, top = int(rect.left // self.cell_size) - self.origin[0], int(rect.top // self.cell_size) - self.origin[1]
+            right, bottom = int(rect.right // self.cell_size) - self.origin[0], int(rect.bottom // self.cell_size) - self.origin[1]
+            blocked[top:bottom + 1, left:right + 1] = 1
+        self.blocked = np.zeros((rows + 1, columns + 1), dtype = np.int32)
+        self.blocked[1:, 1:] = blocked.cumsum(axis = 0).cumsum(axis = 1)
+
+    def add_enemy(self, enemy):
+        self.enemies.add(enemy, enemy.hitbox_rect.center, (0, 0), enemy.hitbox_rect.size, enemy.archetype.speed,
+                         phase = enemy.frame_index, rate = enemy.archetype.animation_speed, frame_count = len(enemy.frames))
+
+    def add_bullet(self, bullet):
+        self.bullets.add(bullet, bullet.rect.center, bullet.direction, bullet.rect.size, bullet.archetype.speed,
+                         expires = bullet.spawn_time + bullet.archetype.lifetime)
+
+    def cells(self, coordinates):
+        cell = np.floor_divide(coordinates, self.cell_size).astype(np.int64) - self.origin
+        return np.clip(cell, 0, np.array(self.blocked.shape[::-1]) - 2)
+
+    def obstructed(self, low, high):
+        # whether each box low..high touches a cell holding an obstacle
+        if self.grid_version != self.collision_grid.version:
+            self.build_obstacles()
+        (left, top), (right, bottom) = self.cells(low).T, (self.cells(high) + 1).T
+        area = self.blocked[bottom, right] - self.blocked[top, right] - self.blocked[bottom, left] + self.blocked[top, left]
+        return area > 0
+
+    def paths_obstructed(self, starts, ends, sizes):
+        # whether the box swept along each path can touch an obstacle, one lookup for all bullets
+        starts, ends = np.array(starts, dtype = float).reshape(-1, 2), np.array(ends, dtype = float).reshape(-1, 2)
+        half = np.array(sizes, dtype = float).reshape(-1, 2) / 2
+        return self.obstructed(np.minimum(starts, ends) - half, np.maximum(starts, ends) + half).tolist()
+
+    def goals(self, pos):
+        # flow field target of every enemy's tile, the player where the field has none
+        player = np.array(self.player.rect.center, dtype = float)
+        field = self.flow_field
+        if field is None:
+            return player
+        if self.field_version != field.version:
+            self.field_targets = np.array([target or (np.nan, np.nan) for target in field.targets], dtype = float).reshape(-1, 2)
+            self.field_version = field.version
+        tile = np.floor_divide(pos, field.tile_size).astype(np.int64) - (field.left, field.top)
+        inside = (tile[:, 0] >= 0) & (tile[:, 0] < field.columns) & (tile[:, 1] >= 0) & (tile[:, 1] < field.rows)
+        goals = np.full_like(pos, np.nan)
+        goals[inside] = self.field_targets[tile[inside, 1] * field.columns + tile[inside, 0]]
+        return np.where(np.isnan(goals), player, goals)
+
+    def update_enemies(self, dt):
+        store, count = self.enemies, len(self.enemies)
+        if not count:
+            return
+        pos, size = store.pos[:count], store.size[:count]
+
+        # homing
+        offset = self.goals(pos) - pos
+        length = np.hypot(offset[:, 0], offset[:, 1])
+        direction = np.divide(offset, length[:, None], out = np.zeros_like(offset), where = length[:, None] != 0)
+        store.direction[:count] = direction
+        velocity = direction * (store.speed[:count] * dt)[:, None]
+
+        # enemies whose swept hitbox reaches a blocked cell resolve collisions per sprite,
+        # everyone else moves freely
+        half = size / 2
+        low = pos - half + np.minimum(velocity, 0)
+        high = pos + half + np.maximum(velocity, 0)
+        near = self.obstructed(low, high)
+        free = ~near
+        pos[free] += velocity[free]
+        for slot in np.flatnonzero(near).tolist():
+            enemy = store.sprites[slot]
+            enemy.direction.update(direction[slot])
+            enemy.step(pygame.Vector2(velocity[slot].tolist()))
+            pos[slot] = enemy.hitbox_rect.center
+
+        # animation
+        phase = store.phase[:count]
+        phase += store.rate[:count] * dt
+        frames = (phase.astype(np.int64) % store.frame_count[:count]).tolist()
+
+        # sprites read their rects and images back from the arrays
+        for enemy, center, frame, frame_index in zip(store.sprites, pos.tolist(), frames, phase.tolist()):
+            enemy.hitbox_rect.center = enemy.rect.center = center
+            enemy.frame_index = frame_index
+            enemy.image = enemy.frames[frame]
+            enemy.mask = enemy.masks[frame]
+
+    def update_bullets(self, dt):
+        store, count = self.bullets, len(self.bullets)
+        if not count:
+            return
+        pos = store.pos[:count]
+        pos += store.direction[:count] * (store.speed[:count] * dt)[:, None]
+        for bullet, center in zip(store.sprites, pos.tolist()):
+            bullet.previous = bullet.rect.center
+            bullet.rect.center = center
+
+        # expired bullets leave from the back so the swap-removal keeps the other slots valid
+        expired = np.flatnonzero(store.expires[:count] <= game_time.get_ticks())
+        for slot in expired[::-1].tolist():
+            store.sprites[slot].kill()
+
+    def update(self, dt):
+        self.update_enemies(dt)
+        self.update_bullets(dt)
@@ -0,0 +1,288 @@
+# frame loop benchmarks, run from the project root: python code/bench.py [--save]
+from settings import * 
+from main import Game
+from config import config
+from timing import game_time
+from collision import sweep_rect
+from controls import ReplayControls
+from sprites import Enemy, Bullet, Tiger, ScrollSprite, CollisionSprite
+from argparse import ArgumentParser
+from time import perf_counter_ns
+from math import ceil
+from os import makedirs
+from os.path import basename, dirname, exists
+from random import Random
+import json
+import tracemalloc
+
+BASELINE_PATH = join('data', 'bench', 'baseline.json')
+PHASES = ('update', 'collision', 'draw', 'hud')
+TUNNELING_FRAME_TIMES = (1 / 60, 1 / 30, 0.05, 0.075, 0.1)
+
+# name: (enemies, bullets, tigers uncaged, scroll overlay open)
+SCENARIOS = {
+    'idle': (0, 0, False, False),
+    'default': (10, 10, False, False),
+    'tigers': (10, 10, True, False),
+    'scroll': (10, 10, False, True),
+    'horde': (200, 100, True, False),
+    'swarm': (2000, 500, False, False),
+}
+
+def percentile(samples, fraction):
+    if not samples:
+        raise ValueError('no samples to take a percentile of')
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+class Scenario:
+    def __init__(self, enemies, bullets, tigers, scroll, seed = 0, batch = True):
+        self.random = Random(seed)
+        start = perf_counter_ns()
+        # the whole map is loaded, so the knobs cover every spawn point and tiger as they did before streaming
+        self.game = Game(headless = True, seed = seed, streaming = False)
+        self.setup_time = (perf_counter_ns() - start) / 1e6
+        if not batch:
+            self.game.batch = None
+
+        # the scenario keeps the entity counts fixed, the game's own spawner is switched off
+        self.game.spawner.stop()
+        self.enemies, self.bullets = enemies, bullets
+        if tigers:
+            for tiger in self.game.tiger_sprites:
+                tiger.uncage()
+        if scroll:
+            scroll = min(self.game.scroll_sprites, key = lambda sprite: sprite.scroll_id)
+            self.game.reading_scroll = True
+            self.game.current_scroll_id = scroll.scroll_id
+            self.game.scroll_title, self.game.scroll_text = config.scroll(scroll.scroll_id)
+
+    def refill(self):
+        game = self.game
+        positions = game.spawner.index.points()
+        while len(game.enemy_sprites) < self.enemies:
+            index = self.random.randrange(len(positions) * 8)
+            ring = pygame.Vector2(40 * (index // len(positions)), 0).rotate(index * 45)
+            enemy_type = self.random.choice(list(game.enemy_frames))
+            enemy = game.enemy_pool.spawn(pygame.Vector2(positions[index % len(positions)]) + ring, game.enemy_frames[enemy_type], game.enemy_masks[enemy_type])
+            if game.batch:
+                game.batch.add_enemy(enemy)
+        while len(game.bullet_sprites) < self.bullets:
+            direction = pygame.Vector2(1, 0).rotate(self.random.uniform(0, 360))
+            bullet = game.bullet_pool.spawn(game.bullet_surf, game.bullet_mask, game.player.rect.center, direction)
+            if game.batch:
+                game.batch.add_bullet(bullet)
+
+    def frame(self):
+        # one fixed step and one drawn frame, timed per phase in nanoseconds
+        game = self.game
+        self.refill()
+        if game.reading_scroll:
+            # the world is paused behind the scroll page and the composed frame is reused
+            t0 = perf_counter_ns()
+            game.update(FIXED_DT)
+            t1 = perf_counter_ns()
+            game.draw_modal()
+            t2 = perf_counter_ns()
+            return t1 - t0, 0, t2 - t1, 0
+        t0 = perf_counter_ns()
+        game.update_input(FIXED_DT)
+        game.update_sprites(FIXED_DT)
+        t1 = perf_counter_ns()
+        game.update_collisions()
+        t2 = perf_counter_ns()
+        game.draw_world()
+        t3 = perf_counter_ns()
+        game.draw_hud()
+        t4 = perf_counter_ns()
+        return t1 - t0, t2 - t1, t3 - t2, t4 - t3
+
+class Trace(Scenario):
+    def __init__(self, path, batch = True):
+        # a recorded session replayed tick by tick, with the game's own spawning
+        self.controls = ReplayControls(path)
+        start = perf_counter_ns()
+        self.game = Game(headless = True, controls = self.controls, seed = self.controls.seed)
+        self.setup_time = (perf_counter_ns() - start) / 1e6
+        if not batch:
+            self.game.batch = None
+
+    def refill(self):
+        pass
+
+def run_scenario(knobs, frames, warmup, batch = True):
+    return measure(Scenario(*knobs, batch = batch), frames, warmup)
+
+def measure(scenario, frames, warmup):
+    if frames < 1:
+        raise ValueError(f'no frames left to time after a warmup of {warmup}')
+    for _ in range(warmup):
+        scenario.frame()
+    samples = [scenario.frame() for _ in range(frames)]
+
+    result = {'setup': scenario.setup_time}
+    for index, phase in enumerate(PHASES + ('frame',)):
+        values = [sum(sample) / 1e6 if phase == 'frame' else sample[index] / 1e6 for sample in samples]
+        result[phase] = {'p50': percentile(values, 0.5), 'p90': percentile(values, 0.9), 'p99': percentile(values, 0.99), 'max': max(values)}
+    return result
+
+def memory_report(count = 1000):
+    # bytes per live entity, counted with tracemalloc over many instances of each kind
+    game = Game(headless = True)
+    enemy_type = next(iter(game.enemy_frames))
+    kinds = {
+        'enemy': lambda: Enemy((0, 0), game.enemy_frames[enemy_type], game.enemy_masks[enemy_type], (), game.player, game.collision_grid, game.flow_field),
+        'bullet': lambda: Bullet(game.bullet_surf, game.bullet_mask, (0, 0), pygame.Vector2(1, 0), ()),
+        'tiger': lambda: Tiger((0, 0), game.tiger_images, (), game.collision_grid),
+        'scroll': lambda: ScrollSprite((0, 0), game.scroll_surf, (), 1),
+        'collision': lambda: CollisionSprite((0, 0), game.scroll_surf, ()),
+    }
+    for name, create in kinds.items():
+        tracemalloc.start()
+        start = tracemalloc.get_traced_memory()[0]
+        entities = [create() for _ in range(count)]
+        size = (tracemalloc.get_traced_memory()[0] - start) / count
+        tracemalloc.stop()
+        del entities
+        print(f'  {name:<10} {size:6.0f} bytes')
+
+def fly(game, bullet, dt):
+    # moves one bullet a frame at a time until it hits something or expires,
+    # returns its centers after every collision pass it survived
+    centers = []
+    while bullet.alive():
+        game_time.advance(dt)
+        if bullet.store is not None:
+            game.batch.update_bullets(dt)
+        else:
+            bullet.update(dt)
+        game.enemy_grid.rebuild(game.enemy_sprites)
+        game.bullet_collision()
+        if bullet.alive():
+            centers.append(bullet.rect.center)
+    return centers
+
+def fire(game, pos, direction, batch):
+    bullet = game.bullet_pool.spawn(game.bullet_surf, game.bullet_mask, pos, direction)
+    if batch:
+        game.batch.add_bullet(bullet)
+    return bullet
+
+def tunneling_check():
+    # bullets fired at enemies and walls from every point of a frame's travel, at frame times
+    # up to 100 ms, every one of them has to be stopped by what it was fired at
+    game = Game(headless = True, streaming = False)
+    game.impact_sound.set_volume(0)
+    speed = config.archetype('bullet').speed
+    failures = []
+
+    # enemies straight ahead of the player and of every spawn point, in each direction
+    # that has no wall before the far side of the enemy
+    walls = [sprite.rect for sprite in game.collision_grid.order]
+    lanes = []
+    for start in [pygame.Vector2(game.player.rect.center)] + [pygame.Vector2(pos) for pos in game.spawner.index.points()]:
+        for angle in range(0, 360, 45):
+            direction = pygame.Vector2(1, 0).rotate(angle)
+            end = start + direction * (150 + ceil(max(TUNNELING_FRAME_TIMES) * speed) + 100)
+            if all(sweep_rect(start, end, game.bullet_surf.get_size(), rect) is None for rect in walls):
+                lanes.append((start, direction))
+    if not lanes:
+        failures.append('no lane free of walls to shoot enemies in')
+
+    shots = 0
+    for batch in (True, False):
+        for dt in TUNNELING_FRAME_TIMES:
+            for enemy_type in game.enemy_frames:
+                for start, direction in lanes:
+                    for offset in range(0, ceil(dt * speed), 10):
+                        enemy = game.enemy_pool.spawn(start + direction * (150 + offset), game.enemy_frames[enemy_type], game.enemy_masks[enemy_type])
+                        fly(game, fire(game, start, direction, batch), dt)
+                        if not enemy.death_time:
+                            failures.append(f'enemy {enemy_type} at {dt * 1000:.0f} ms, angle {direction.angle_to((1, 0)):.0f}, offset {offset}')
+                        enemy.kill()
+                        shots += 1
+
+            # every loaded wall, shot at from the left through its middle
+            for wall in list(game.collision_grid.order):
+                for offset in range(0, ceil(dt * speed), 20):
+                    pos = (wall.rect.centerx - 300 - offset, wall.rect.centery)
+                    centers = fly(game, fire(game, pos, pygame.Vector2(1, 0), batch), dt)
+                    if any(x > wall.rect.centerx for x, _ in centers):
+                        failures.append(f'wall at {wall.rect.topleft} at {dt * 1000:.0f} ms, offset {offset}')
+                    shots += 1
+
+    print(f'{shots} shots, {len(failures)} went through')
+    for failure in failures[:20]:
+        print(f'  {failure}')
+    return not failures
+
+def report(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        print(f'{name}: setup {result["setup"]:.1f} ms')
+        for phase in PHASES + ('frame',):
+            stats = result[phase]
+            line = f'  {phase:<10} p50 {stats["p50"]:7.3f}  p90 {stats["p90"]:7.3f}  p99 {stats["p99"]:7.3f}  max {stats["max"]:7.3f} ms'
+            previous = baseline.get(name, {}).get(phase)
+            if previous:
+                change = stats['p50'] / previous['p50'] - 1 if previous['p50'] else 0
+                line += f'  {change:+.0%} p50 vs baseline'
+                if change > tolerance:
+                    regressions.append(f'{name} {phase}')
+            print(line)
+    return regressions
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description = 'Frame loop benchmarks')
+    parser.add_argument('scenarios', nargs = '*', default = list(SCENARIOS), help = f'any of {", ".join(SCENARIOS)}')
+    parser.add_argument('--enemies', type = int, help = 'run a custom scenario with this many enemies')
+    parser.add_argument('--bullets', type = int, default = 0)
+    parser.add_argument('--tigers', action = 'store_true', help = 'uncage every tiger')
+    parser.add_argument('--scroll', action = 'store_true', help = 'keep the scroll overlay open')
+    parser.add_argument('--frames', type = int, default = 600)
+    parser.add_argument('--warmup', type = int, default = 60)
+    parser.add_argument('--no-batch', action = 'store_true', help = 'update every sprite on its own instead of the numpy batch')
+    parser.add_argument('--baseline', default = BASELINE_PATH)
+    parser.add_argument('--save', action = 'store_true', help = 'store the results as the new baseline')
+    parser.add_argument('--memory', action = 'store_true', help = 'report bytes per entity instead of timing frames')
+    parser.add_argument('--replay', metavar = 'FILE', help = 'time every tick of a session recorded with main.py --record')
+    parser.add_argument('--tunneling', action = 'store_true', help = 'check that bullets never pass through enemies or walls')
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = 'p50 slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    if args.memory:
+        memory_report()
+        raise SystemExit
+
+    if args.tunneling:
+        raise SystemExit(0 if tunneling_check() else 1)
+
+    if args.enemies is not None:
+        scenarios = {'custom': (args.enemies, args.bullets, args.tigers, args.scroll)}
+    else:
+        scenarios = {name: SCENARIOS[name] for name in args.scenarios}
+
+    trace = Trace(args.replay, not args.no_batch) if args.replay else None
+    try:
+        if trace:
+            # a trace shorter than the warmup is warmed up over its first half and timed over the rest
+            warmup = min(args.warmup, trace.controls.ticks // 2)
+            results = {f'replay {basename(args.replay)}': measure(trace, trace.controls.ticks - warmup, warmup)}
+        else:
+            results = {name: run_scenario(knobs, args.frames, args.warmup, not args.no_batch) for name, knobs in scenarios.items()}
+    except ValueError as error:
+        raise SystemExit(f'{args.replay}: {error}' if trace else str(error))
+    baseline = {}
+    if exists(args.baseline) and not args.save:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    regressions = report(results, baseline, args.tolerance)
+
+    if args.save:
+        makedirs(dirname(args.baseline), exist_ok = True)
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent = 2)
+        print(f'Saved baseline to {args.baseline}')
+    elif regressions:
+        print(f'Regressions over {args.tolerance:.0%}: {", ".join(regressions)}')
+        raise SystemExit(1)
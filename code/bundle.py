@@ -0,0 +1,176 @@
+from settings import * 
+from assets import assets
+from pytmx import TiledTileLayer
+from pytmx.util_pygame import load_pygame
+from array import array
+from os import makedirs, replace, stat
+from os.path import dirname, exists
+import json
+import mmap
+import struct
+
+BUNDLE_PATH = join('data', 'cache', 'world.bundle')
+BUNDLE_VERSION = 1
+BUNDLE_MAGIC = b'GPB1'
+BUNDLE_ALIGN = 16
+
+# standalone images baked next to the map, loaded through the asset registry
+BUNDLE_IMAGE_FOLDERS = [join('images', folder) for folder in ('enemies', 'gun', 'player', 'scroll', 'tiger')]
+
+class BakedObject:
+    def __init__(self, x, y, width, height, name, image):
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+        self.name = name
+        self.image = image
+
+class BakedTileLayer:
+    def __init__(self, name, grid, width, images):
+        self.name = name
+        self.grid = grid
+        self.width = width
+        self.images = images
+
+    def tiles(self):
+        for index, image_index in enumerate(self.grid):
+            if image_index:
+                yield index % self.width, index // self.width, self.images[image_index]
+
+class BakedMap:
+    # the part of pytmx.TiledMap that Game.setup uses
+    def __init__(self, width, height, layers):
+        self.width, self.height = width, height
+        self.layers = layers
+
+    def get_layer_by_name(self, name):
+        return self.layers[name]
+
+def bundle_sources():
+    # every file the bundle was built from, a change to any of them makes it stale
+    sources = {}
+    for folder in [join('data', 'maps'), join('data', 'tilesets'), join('data', 'graphics')] + BUNDLE_IMAGE_FOLDERS:
+        for folder_path, _, file_names in walk(folder):
+            for file_name in file_names:
+                path = join(folder_path, file_name)
+                info = stat(path)
+                sources[path.replace('\\', '/')] = [info.st_mtime_ns, info.st_size]
+    return sources
+
+def bake(tmx_path, bundle_path = BUNDLE_PATH):
+    tmx = load_pygame(tmx_path)
+    blocks, images = [], []
+    offset = 0
+
+    def add_block(data):
+        nonlocal offset
+        blocks.append(data)
+        start, offset = offset, offset + len(data)
+        padding = -offset % BUNDLE_ALIGN
+        blocks.append(bytes(padding))
+        offset += padding
+        return start
+
+    def add_image(surf, path = None):
+        data = pygame.image.tobytes(surf, 'RGBA')
+        images.append({'path': path, 'size': surf.get_size(), 'alpha': bool(surf.get_flags() & pygame.SRCALPHA),
+                       'offset': add_block(data), 'length': len(data)})
+        return len(images) - 1
+
+    # map images keep their pytmx index, the tile grid stores index + 1 with 0 as empty
+    map_images = {index: add_image(surf) for index, surf in enumerate(tmx.images) if surf}
+    layers = {}
+    for layer in tmx.layers:
+        if isinstance(layer, TiledTileLayer):
+            grid = array('H', (map_images[gid] + 1 if gid else 0 for row in layer.data for gid in row))
+            data = grid.tobytes()
+            layers[layer.name] = {'type': 'tiles', 'offset': add_block(data), 'length': len(data)}
+        else:
+            layers[layer.name] = {'type': 'objects', 'objects': [
+                [obj.x, obj.y, obj.width, obj.height, obj.name, map_images[obj.gid] if obj.gid else -1] for obj in layer]}
+
+    for folder in BUNDLE_IMAGE_FOLDERS:
+        for folder_path, _, file_names in walk(folder):
+            for file_name in sorted(file_names):
+                path = join(folder_path, file_name)
+                add_image(pygame.image.load(path).convert_alpha(), path.replace('\\', '/'))
+
+    header = json.dumps({
+        'version': BUNDLE_VERSION,
+        'sources': bundle_sources(),
+        'map': {'width': tmx.width, 'height': tmx.height, 'layers': layers},
+        'images': images}).encode('utf-8')
+    header += b' ' * (-(len(header) + 8) % BUNDLE_ALIGN)
+
+    # written next to the bundle and swapped in whole, an interrupted bake leaves the old one
+    makedirs(dirname(bundle_path), exist_ok = True)
+    with open(bundle_path + '.tmp', 'wb') as file:
+        file.write(BUNDLE_MAGIC + struct.pack('<I', len(header)) + header)
+        for block in blocks:
+            file.write(block)
+    replace(bundle_path + '.tmp', bundle_path)
+    return len(images), offset
+
+def bundle_block(view, start, length):
+    # a slice of the mapped file, checked against its size so a cut off bundle is rejected
+    if start + length > len(view):
+        raise ValueError(f'block at {start} runs past the end of the bundle')
+    return view[start: start + length]
+
+def decode_image(view, start, image):
+    # the frame only borrows the mapped bytes while it is converted into a surface that owns its pixels,
+    # every reference into the map is dropped before returning or raising
+    with bundle_block(view, start, image['length']) as block:
+        raw = pygame.image.frombuffer(block, image['size'], 'RGBA')
+        try:
+            return raw.convert_alpha() if image['alpha'] else raw.convert()
+        finally:
+            del raw
+
+def read_bundle(bundle_path):
+    with open(bundle_path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+    try:
+        if data[:4] != BUNDLE_MAGIC:
+            return None
+        header_length = struct.unpack('<I', data[4:8])[0]
+        header = json.loads(data[8:8 + header_length])
+        if header['version'] != BUNDLE_VERSION or header['sources'] != bundle_sources():
+            return None
+
+        base = 8 + header_length
+        with memoryview(data) as view:
+            surfaces, bundled = [], {}
+            for image in header['images']:
+                surf = decode_image(view, base + image['offset'], image)
+                surfaces.append(surf)
+                if image['path']:
+                    bundled[join(*image['path'].split('/'))] = surf
+
+            layers = {}
+            for name, layer in header['map']['layers'].items():
+                if layer['type'] == 'tiles':
+                    grid = array('H')
+                    with bundle_block(view, base + layer['offset'], layer['length']) as block:
+                        grid.frombytes(block)
+                    layers[name] = BakedTileLayer(name, grid, header['map']['width'], [None] + surfaces)
+                else:
+                    layers[name] = [BakedObject(x, y, width, height, obj_name, surfaces[image] if image >= 0 else None) 
+                                    for x, y, width, height, obj_name, image in layer['objects']]
+        return BakedMap(header['map']['width'], header['map']['height'], layers), bundled
+    finally:
+        data.close()
+
+def load_world(tmx_path, bundle_path = BUNDLE_PATH):
+    # baked bundle when it is up to date, the tmx otherwise
+    if exists(bundle_path):
+        try:
+            bundle = read_bundle(bundle_path)
+        except (OSError, ValueError, KeyError, BufferError, struct.error, pygame.error) as e:
+            print(f'Error reading map bundle: {e}')
+            bundle = None
+        if bundle:
+            world, bundled = bundle
+            assets.add_bundle(bundled)
+            return world
+        print('Map bundle is stale, run code/bake.py to rebuild it')
+    return load_pygame(tmx_path)
@@ -0,0 +1,82 @@
+from settings import * 
+
+class SpatialGrid:
+    def __init__(self, sprites, cell_size = COLLISION_CELL_SIZE):
+        # uniform grid over sprite rects, static sprites are inserted once
+        self.cell_size = cell_size
+        self.cells = {}
+        self.order = {}
+        self.inserted = 0
+        # counts inserts and removals, for lookups built over the grid's sprites
+        self.version = 0
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def cell_range(self, rect):
+        return (range(int(rect.left // self.cell_size), int(rect.right // self.cell_size) + 1),
+                range(int(rect.top // self.cell_size), int(rect.bottom // self.cell_size) + 1))
+
+    def insert(self, sprite):
+        self.order[sprite] = self.inserted
+        self.inserted += 1
+        self.version += 1
+        columns, rows = self.cell_range(sprite.rect)
+        for y in rows:
+            for x in columns:
+                self.cells.setdefault((x, y), []).append(sprite)
+
+    def remove(self, sprite):
+        # static sprites leave when the world region holding them is unloaded
+        del self.order[sprite]
+        self.version += 1
+        columns, rows = self.cell_range(sprite.rect)
+        for y in rows:
+            for x in columns:
+                cell = self.cells[(x, y)]
+                cell.remove(sprite)
+                if not cell:
+                    del self.cells[(x, y)]
+
+    def query(self, rect):
+        # sprites in the cells the rect overlaps, in insertion order so that
+        # collision resolution matches a linear scan of the whole group
+        columns, rows = self.cell_range(rect)
+        found = {}
+        for y in rows:
+            for x in columns:
+                for sprite in self.cells.get((x, y), ()):
+                    found[sprite] = None
+        return sorted(found, key = self.order.__getitem__)
+
+    def rebuild(self, sprites):
+        # dynamic use, sprites that move are re-inserted every frame
+        self.cells.clear()
+        self.order.clear()
+        self.inserted = 0
+        for sprite in sprites:
+            self.insert(sprite)
+
+def sweep_rect(start, end, size, rect):
+    # distance along start..end at which a box of size centered on the segment first touches rect, or None
+    clipped = rect.inflate(size).clipline(start, end)
+    return pygame.Vector2(start).distance_to(clipped[0]) if clipped else None
+
+def sweep_mask(start, end, mask, size, sprite, step):
+    # distance along start..end at which mask, centered on the segment, first overlaps the sprite's mask,
+    # sampled every step pixels between where the boxes start and stop touching
+    clipped = sprite.rect.inflate(size).clipline(start, end)
+    if not clipped:
+        return None
+    (x, y), (end_x, end_y) = start, end
+    length = ((end_x - x) ** 2 + (end_y - y) ** 2) ** 0.5
+    first = ((clipped[0][0] - x) ** 2 + (clipped[0][1] - y) ** 2) ** 0.5
+    last = ((clipped[1][0] - x) ** 2 + (clipped[1][1] - y) ** 2) ** 0.5
+    left, top = x - size[0] / 2 - sprite.rect.left, y - size[1] / 2 - sprite.rect.top
+    dx, dy = ((end_x - x) / length, (end_y - y) / length) if length else (0, 0)
+    distance = first
+    while True:
+        if sprite.mask.overlap(mask, (round(left + dx * distance), round(top + dy * distance))):
+            return distance
+        if distance >= last:
+            return None
+        distance = min(distance + step, last)
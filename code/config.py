@@ -0,0 +1,144 @@
+from settings import * 
+from archetypes import Archetype, validate_archetypes
+from os import makedirs, stat
+from os.path import dirname, exists
+import json
+import pickle
+
+ARCHETYPES_PATH = join('data', 'archetypes.json')
+SCROLLS_PATH = join('data', 'scrolls.json')
+WAVES_PATH = join('data', 'waves.json')
+CONFIG_PATH = join('data', 'cache', 'config.cache')
+SCROLL_TEXT_PATH = join('data', 'cache', 'scrolls.txt')
+CONFIG_VERSION = 4
+
+def config_sources():
+    sources = {}
+    for path in (ARCHETYPES_PATH, SCROLLS_PATH, WAVES_PATH):
+        info = stat(path)
+        sources[path.replace('\\', '/')] = [info.st_mtime_ns, info.st_size]
+    return sources
+
+def read_archetypes():
+    with open(ARCHETYPES_PATH, encoding = 'utf-8') as file:
+        return validate_archetypes(json.load(file), ARCHETYPES_PATH)
+
+def read_scrolls():
+    with open(SCROLLS_PATH, encoding = 'utf-8') as file:
+        data = json.load(file)
+    scrolls = data.get('scrolls') if isinstance(data, dict) else None
+    if not isinstance(scrolls, list):
+        raise ValueError(f'{SCROLLS_PATH}: expected a list of scrolls')
+    for index, scroll in enumerate(scrolls):
+        if not isinstance(scroll, dict) or not isinstance(scroll.get('title'), str) or not isinstance(scroll.get('text'), str):
+            raise ValueError(f'{SCROLLS_PATH}: scroll {index + 1} needs a title and a text')
+    return [(scroll['title'], scroll['text']) for scroll in scrolls]
+
+def read_waves():
+    # (most alive at once, ms between spawns or None for the enemy cooldown, enemies in total or 0 for
+    # endless, ms before the first spawn, enemy types or () for all of them) per wave
+    with open(WAVES_PATH, encoding = 'utf-8') as file:
+        data = json.load(file)
+    waves = data.get('waves') if isinstance(data, dict) else None
+    if not isinstance(waves, list) or not waves:
+        raise ValueError(f'{WAVES_PATH}: expected a list of waves')
+    fields = {'alive': 1, 'interval': None, 'total': 0, 'delay': 0, 'types': []}
+    result = []
+    for index, wave in enumerate(waves):
+        if not isinstance(wave, dict):
+            raise ValueError(f'{WAVES_PATH}: wave {index + 1} must be an object')
+        unknown = set(wave) - set(fields)
+        if unknown:
+            raise ValueError(f'{WAVES_PATH}: wave {index + 1} has unknown fields {", ".join(sorted(unknown))}')
+        values = {field: wave.get(field, default) for field, default in fields.items()}
+        for field in ('alive', 'total'):
+            if not isinstance(values[field], int) or isinstance(values[field], bool) or values[field] < 0:
+                raise ValueError(f'{WAVES_PATH}: wave {index + 1}.{field} must be a whole number')
+        for field in ('interval', 'delay'):
+            if values[field] is not None and (not isinstance(values[field], (int, float)) or isinstance(values[field], bool) or values[field] < 0):
+                raise ValueError(f'{WAVES_PATH}: wave {index + 1}.{field} must not be negative')
+        if not values['alive']:
+            raise ValueError(f'{WAVES_PATH}: wave {index + 1}.alive must be at least 1')
+        if values['alive'] > ENEMY_BUDGET:
+            raise ValueError(f'{WAVES_PATH}: wave {index + 1}.alive is over the enemy budget of {ENEMY_BUDGET}')
+        if not isinstance(values['types'], list) or not all(isinstance(name, str) for name in values['types']):
+            raise ValueError(f'{WAVES_PATH}: wave {index + 1}.types must be a list of enemy names')
+        result.append((values['alive'], values['interval'], values['total'], values['delay'], tuple(values['types'])))
+    return result
+
+def compile_config(cache_path = CONFIG_PATH, text_path = SCROLL_TEXT_PATH):
+    # validated archetypes, waves and a scroll index pickled together, the scroll texts go into a
+    # separate file that is only read from when a scroll is opened
+    archetypes = read_archetypes()
+    waves = read_waves()
+    index, texts = [], bytearray()
+    for title, text in read_scrolls():
+        data = text.encode('utf-8')
+        index.append((title, len(texts), len(data)))
+        texts += data
+
+    makedirs(dirname(cache_path), exist_ok = True)
+    with open(text_path, 'wb') as file:
+        file.write(texts)
+    with open(cache_path, 'wb') as file:
+        # the waves were checked against the enemy budget, a new budget checks them again
+        pickle.dump({'version': CONFIG_VERSION, 'sources': config_sources(), 'budget': ENEMY_BUDGET, 'archetypes': archetypes,
+                     'scrolls': index, 'waves': waves}, file, pickle.HIGHEST_PROTOCOL)
+    return len(archetypes), len(index), len(waves)
+
+class GameConfig:
+    def __init__(self, cache_path = CONFIG_PATH, text_path = SCROLL_TEXT_PATH):
+        # loaded on first use, from the compiled cache when it is up to date
+        self.cache_path = cache_path
+        self.text_path = text_path
+        self.archetypes = None
+        self.scroll_index = None
+        self.wave_list = None
+        self.compiled = False
+
+    def load(self):
+        if exists(self.cache_path) and exists(self.text_path):
+            try:
+                with open(self.cache_path, 'rb') as file:
+                    cache = pickle.load(file)
+                if cache['version'] == CONFIG_VERSION and cache['sources'] == config_sources() and cache['budget'] == ENEMY_BUDGET:
+                    self.archetypes = {name: Archetype(name, *values) for name, values in cache['archetypes'].items()}
+                    self.scroll_index = cache['scrolls']
+                    self.wave_list = cache['waves']
+                    self.compiled = True
+                    return
+            except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+                print(f'Error reading config cache: {e}')
+            print('Config cache is stale, run code/bake.py to rebuild it')
+
+        self.archetypes = {name: Archetype(name, *values) for name, values in read_archetypes().items()}
+        self.scroll_index = [(title, None, None) for title, _ in read_scrolls()]
+        self.wave_list = read_waves()
+
+    def archetype(self, name):
+        if self.archetypes is None:
+            self.load()
+        return self.archetypes[name]
+
+    def scroll_count(self):
+        if self.scroll_index is None:
+            self.load()
+        return len(self.scroll_index)
+
+    def waves(self):
+        if self.wave_list is None:
+            self.load()
+        return self.wave_list
+
+    def scroll(self, scroll_id):
+        # title and text of a scroll, ids start at 1
+        if self.scroll_index is None:
+            self.load()
+        title, offset, length = self.scroll_index[scroll_id - 1]
+        if not self.compiled:
+            return title, read_scrolls()[scroll_id - 1][1]
+        with open(self.text_path, 'rb') as file:
+            file.seek(offset)
+            return title, file.read(length).decode('utf-8')
+
+config = GameConfig()
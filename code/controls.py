@@ -0,0 +1,133 @@
+from settings import * 
+import struct
+
+# input log: header of magic, version, seed and timestep, then runs of identical ticks as
+# (ticks, move and buttons packed in one byte, aim x, aim y)
+REPLAY_MAGIC = b'GPR1'
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct('<4sHIf')
+REPLAY_RUN = struct.Struct('<HBhh')
+
+class ControlState:
+    def __init__(self, move = (0, 0), aim = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 + 1), fire = False, interact = False):
+        # one tick of input: move direction, aim in screen coordinates,
+        # left mouse button (fire / close scroll) and right mouse button (uncage tigers)
+        self.move = move
+        self.aim = aim
+        self.fire = fire
+        self.interact = interact
+
+class LiveControls:
+    def __init__(self):
+        self.state = ControlState()
+
+    def poll(self, tick, game):
+        keys = pygame.key.get_pressed()
+        buttons = pygame.mouse.get_pressed()
+        self.state = ControlState(
+            (int(keys[pygame.K_RIGHT] or keys[pygame.K_d]) - int(keys[pygame.K_LEFT] or keys[pygame.K_a]),
+             int(keys[pygame.K_DOWN] or keys[pygame.K_s]) - int(keys[pygame.K_UP] or keys[pygame.K_w])),
+            pygame.mouse.get_pos(), buttons[0], buttons[2])
+
+    def close(self):
+        pass
+
+class ScriptedControls:
+    def __init__(self, script):
+        # script(tick, game) returns the ControlState for that tick
+        self.script = script
+        self.state = ControlState()
+
+    def poll(self, tick, game):
+        self.state = self.script(tick, game)
+
+    def close(self):
+        pass
+
+def pack_state(state):
+    # the recorded form of a tick, aim is kept to whole pixels
+    flags = (int(state.move[0]) + 1) | (int(state.move[1]) + 1) << 2 | bool(state.fire) << 4 | bool(state.interact) << 5
+    return flags, max(-32768, min(32767, round(state.aim[0]))), max(-32768, min(32767, round(state.aim[1])))
+
+def unpack_state(flags, aim_x, aim_y):
+    return ControlState(((flags & 3) - 1, (flags >> 2 & 3) - 1), (aim_x, aim_y), bool(flags & 16), bool(flags & 32))
+
+class RecordingControls:
+    def __init__(self, controls, path, seed):
+        # polls other controls and writes every tick to a binary log, the game then plays with
+        # the recorded form of the input so that the session and its replay stay the same
+        self.controls = controls
+        self.file = open(path, 'wb')
+        # the header goes out at once, a session closed before its first tick still replays
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, FIXED_DT))
+        self.state = ControlState()
+        self.run = None
+        self.count = 0
+
+    def poll(self, tick, game):
+        self.controls.poll(tick, game)
+        run = pack_state(self.controls.state)
+        self.state = unpack_state(*run)
+        if run == self.run and self.count < 65535:
+            self.count += 1
+        else:
+            self.flush()
+            self.run, self.count = run, 1
+
+    def flush(self):
+        if self.count:
+            self.file.write(REPLAY_RUN.pack(self.count, *self.run))
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.controls.close()
+
+class ReplayControls:
+    def __init__(self, path):
+        # plays back a log written by RecordingControls, idle once it runs out
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < REPLAY_HEADER.size:
+            raise ValueError(f'{path}: not an input log of this version')
+        magic, version, self.seed, step = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f'{path}: not an input log of this version')
+        if step != struct.unpack('<f', struct.pack('<f', FIXED_DT))[0]:
+            raise ValueError(f'{path}: recorded with a timestep of {step:.4f} s')
+        # a log cut short still replays up to its last whole run
+        runs = data[REPLAY_HEADER.size:]
+        self.runs = list(REPLAY_RUN.iter_unpack(runs[:len(runs) - len(runs) % REPLAY_RUN.size]))
+        self.ticks = sum(run[0] for run in self.runs)
+        self.state = ControlState()
+        self.index = 0
+        self.remaining = 0
+        self.finished = False
+
+    def poll(self, tick, game):
+        if not self.remaining:
+            if self.index == len(self.runs):
+                self.state = ControlState()
+                self.finished = True
+                return
+            self.remaining, *run = self.runs[self.index]
+            self.state = unpack_state(*run)
+            self.index += 1
+        self.remaining -= 1
+
+    def close(self):
+        pass
+
+def idle(tick, game):
+    return ControlState()
+
+def patrol(tick, game):
+    # walks a square and keeps shooting at the nearest enemy, for soak and balance runs
+    side = (tick // 120) % 4
+    move = [(1, 0), (0, 1), (-1, 0), (0, -1)][side]
+    aim = (WINDOW_WIDTH / 2 + 100, WINDOW_HEIGHT / 2)
+    if game.enemy_sprites:
+        player_pos = pygame.Vector2(game.player.rect.center)
+        target = min(game.enemy_sprites, key = lambda enemy: player_pos.distance_squared_to(enemy.rect.center))
+        aim = pygame.Vector2(target.rect.center) - player_pos + (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+    return ControlState(move, tuple(aim), True, True)
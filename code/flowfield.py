@@ -0,0 +1,178 @@
+from settings import *
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+import multiprocessing
+
+# graph of the field in each worker process, built again when the field's window moves
+worker_graph = None
+
+def search_job(goal, graph, area, blocked, tile_size):
+    global worker_graph
+    if worker_graph is None or worker_graph[0] != graph:
+        worker_graph = (graph,) + build_graph(area, blocked, tile_size)
+    return search(goal, *worker_graph[1:])
+
+def build_graph(area, blocked, tile_size):
+    # open neighbours of every tile, straight ones for the search and diagonals for steering
+    # only when both sides are open, so enemies do not cut corners
+    left, top, columns, rows = area
+    half = tile_size / 2
+    centers = [((left + index % columns) * tile_size + half, (top + index // columns) * tile_size + half) for index in range(columns * rows)]
+    adjacent = [[] for _ in range(columns * rows)]
+    moves = [[] for _ in range(columns * rows)]
+    for index in range(columns * rows):
+        x, y = index % columns, index // columns
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < columns and 0 <= ny < rows) or blocked[ny * columns + nx]:
+                continue
+            if blocked[index]:
+                # enemies pushed into a blocked tile, or a player standing in one, reach any open neighbour
+                moves[index].append(ny * columns + nx)
+                adjacent[index].append(ny * columns + nx)
+                continue
+            if dx and dy:
+                if blocked[y * columns + nx] or blocked[ny * columns + x]:
+                    continue
+            else:
+                adjacent[index].append(ny * columns + nx)
+            moves[index].append(ny * columns + nx)
+    return adjacent, moves, centers
+
+def search(goal, adjacent, moves, centers):
+    # breadth first distances from the goal tile, every tile then points at the center of its
+    # closest neighbour and None means go straight at the player
+    unreached = len(adjacent)
+    distance = [unreached] * unreached
+    targets = [None] * unreached
+    if goal is None:
+        return targets
+
+    distance[goal] = 0
+    queue = deque((goal,))
+    while queue:
+        index = queue.popleft()
+        next_distance = distance[index] + 1
+        for neighbour in adjacent[index]:
+            if distance[neighbour] == unreached:
+                distance[neighbour] = next_distance
+                queue.append(neighbour)
+
+    for index, tile_moves in enumerate(moves):
+        if tile_moves and index != goal:
+            best = min(tile_moves, key = distance.__getitem__)
+            if distance[best] < distance[index]:
+                targets[index] = centers[best]
+    return targets
+
+class FlowField:
+    def __init__(self, columns, rows, obstacles, window = FLOW_WINDOW, tile_size = TILE_SIZE, clearance = FLOW_CLEARANCE, workers = 0):
+        # steering targets towards the player's tile, every tile points at its best neighbour,
+        # the field covers a window of the map around the player that follows the player once
+        # they are a region away from its center, obstacles(rect) gives the obstacles in an area
+        self.map_columns, self.map_rows = columns, rows
+        self.obstacles = obstacles
+        self.window = window
+        self.tile_size = tile_size
+        self.clearance = clearance
+
+        # the window's graph, in tiles of the map
+        self.area = None
+        self.center = None
+        self.graph = 0
+        self.blocked = bytearray()
+        self.adjacent = self.moves = self.centers = []
+
+        # the plan enemies steer by and the window it was searched on
+        self.left = self.top = self.columns = self.rows = 0
+        self.goal = None
+        self.planned = None
+        self.targets = []
+        self.version = 0
+
+        # with workers the search runs in other processes, the field keeps steering with the
+        # last finished plan and swaps in the next one once it is done
+        self.workers = None
+        self.pending = None
+        self.pending_goal = None
+        if workers:
+            self.workers = ProcessPoolExecutor(workers, multiprocessing.get_context('spawn'))
+
+    def move(self, tile):
+        x, y = tile
+        if self.center and abs(x - self.center[0]) < REGION_SIZE and abs(y - self.center[1]) < REGION_SIZE:
+            return
+        self.center = tile
+        columns, rows = min(self.window, self.map_columns), min(self.window, self.map_rows)
+        area = (min(max(x - columns // 2, 0), self.map_columns - columns), min(max(y - rows // 2, 0), self.map_rows - rows), columns, rows)
+        if area == self.area:
+            return
+
+        # a tile is blocked when an obstacle, grown by the clearance enemies need, covers its center
+        left, top = area[0], area[1]
+        size = self.tile_size
+        blocked = bytearray(columns * rows)
+        bounds = pygame.FRect(left * size, top * size, columns * size, rows * size).inflate(self.clearance[0] * 2, self.clearance[1] * 2)
+        for rect in self.obstacles(bounds):
+            rect = rect.inflate(self.clearance[0] * 2, self.clearance[1] * 2)
+            first_x, first_y = max(ceil(rect.left / size - 0.5) - left, 0), max(ceil(rect.top / size - 0.5) - top, 0)
+            last_x, last_y = min(ceil(rect.right / size - 0.5) - 1 - left, columns - 1), min(ceil(rect.bottom / size - 0.5) - 1 - top, rows - 1)
+            for row in range(first_y, last_y + 1):
+                for column in range(first_x, last_x + 1):
+                    blocked[row * columns + column] = 1
+        self.area, self.blocked = area, blocked
+        self.adjacent, self.moves, self.centers = build_graph(area, blocked, size)
+        self.graph += 1
+
+    def tile(self, pos):
+        x, y = int(pos[0] // self.tile_size), int(pos[1] // self.tile_size)
+        if 0 <= x < self.map_columns and 0 <= y < self.map_rows:
+            return x, y
+        return None
+
+    def index(self, tile):
+        # index of a map tile in the window's graph
+        if tile is None:
+            return None
+        left, top, columns, rows = self.area
+        x, y = tile[0] - left, tile[1] - top
+        return y * columns + x if 0 <= x < columns and 0 <= y < rows else None
+
+    def update(self, pos):
+        # only a new player tile or a moved window changes the field
+        if self.pending and self.pending.done():
+            (goal, graph), targets = self.pending_goal, self.pending.result()
+            self.pending = None
+            # a plan for a window that has moved since is searched again
+            if graph == self.graph:
+                self.swap(goal, targets)
+
+        goal = self.tile(pos)
+        if goal:
+            self.move(goal)
+        if self.area and self.pending is None and (goal != self.goal or self.planned != self.graph):
+            if self.workers and self.version:
+                self.pending = self.workers.submit(search_job, self.index(goal), self.graph, self.area, self.blocked, self.tile_size)
+                self.pending_goal = (goal, self.graph)
+            else:
+                # the first field is searched right away so enemies never start without one
+                self.swap(goal, search(self.index(goal), self.adjacent, self.moves, self.centers))
+
+    def swap(self, goal, targets):
+        self.goal = goal
+        self.planned = self.graph
+        self.left, self.top, self.columns, self.rows = self.area
+        self.targets = targets
+        self.version += 1
+
+    def target(self, pos):
+        # point to steer at from pos, or None when the player is close or out of reach
+        x, y = int(pos[0] // self.tile_size) - self.left, int(pos[1] // self.tile_size) - self.top
+        if 0 <= x < self.columns and 0 <= y < self.rows:
+            return self.targets[y * self.columns + x]
+        return None
+
+    def shutdown(self):
+        if self.workers:
+            self.workers.shutdown(wait = False, cancel_futures = True)
@@ -0,0 +1,48 @@
+from settings import * 
+from math import floor
+
+class GroundChunks:
+    def __init__(self, tiles, baked = True):
+        # ground tiles baked into fixed-size chunk surfaces, all of them at load
+        # or, when the world is streamed, only the chunks of the loaded regions
+        self.chunk_size = CHUNK_SIZE * TILE_SIZE
+        self.chunks = {}
+        self.tiles = {}
+
+        # keep the old per-sprite draw order, oversized tiles overlap their neighbours
+        tiles = sorted(tiles, key = lambda tile: tile[1] * TILE_SIZE + tile[2].get_height() / 2)
+        for x, y, surf in tiles:
+            rect = surf.get_rect(topleft = (x * TILE_SIZE, y * TILE_SIZE))
+            for chunk_y in range(rect.top // self.chunk_size, (rect.bottom - 1) // self.chunk_size + 1):
+                for chunk_x in range(rect.left // self.chunk_size, (rect.right - 1) // self.chunk_size + 1):
+                    self.tiles.setdefault((chunk_x, chunk_y), []).append(
+                        (surf, (rect.left - chunk_x * self.chunk_size, rect.top - chunk_y * self.chunk_size)))
+        if baked:
+            for key in self.tiles:
+                self.bake(key)
+
+    def bake(self, key):
+        if key in self.tiles and key not in self.chunks:
+            chunk = pygame.Surface((self.chunk_size, self.chunk_size)).convert()
+            chunk.blits(self.tiles[key], doreturn = False)
+            self.chunks[key] = chunk
+
+    def unload(self, key):
+        self.chunks.pop(key, None)
+
+    def draw(self, surface, offset):
+        # only the chunks overlapping the camera are blitted
+        width, height = surface.get_size()
+        left = floor(-offset.x / self.chunk_size)
+        top = floor(-offset.y / self.chunk_size)
+        right = floor((width - offset.x) / self.chunk_size)
+        bottom = floor((height - offset.y) / self.chunk_size)
+
+        blits = 0
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                chunk = self.chunks.get((x, y))
+                if chunk:
+                    surface.blit(chunk, (x * self.chunk_size + offset.x, y * self.chunk_size + offset.y))
+                    blits += 1
+        return blits
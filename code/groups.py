@@ -1,18 +1,132 @@
 from settings import * 
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from operator import itemgetter
+
+class DrawList:
+    def __init__(self):
+        # sprites sorted by the centery they had when they were inserted, keys[i] belongs to sprites[i]
+        self.keys = []
+        self.sprites = []
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def insert(self, sprite, key):
+        index = bisect_right(self.keys, key)
+        self.keys.insert(index, key)
+        self.sprites.insert(index, sprite)
+
+    def remove(self, sprite, key):
+        index = bisect_left(self.keys, key)
+        while self.sprites[index] is not sprite:
+            index += 1
+        del self.keys[index]
+        del self.sprites[index]
+
+    def band(self, top, bottom):
+        start, end = bisect_left(self.keys, top), bisect_right(self.keys, bottom)
+        return zip(self.keys[start:end], self.sprites[start:end])
 
 class AllSprites(pygame.sprite.Group):
     def __init__(self):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.Vector2()
-    
-    def draw(self, target_pos):
+        self.view = pygame.FRect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.ground = None
+
+        # persistent y-sorted draw lists, sprites without an update of their own never move and are
+        # sorted in once, the others are moved in their list only when their centery changes
+        self.static = DrawList()
+        self.moving = DrawList()
+        self.keys = {}
+        self.new_sprites = {}
+
+        # how far a sprite's image reaches above and below its centery, for the band that can be in view
+        self.cull_above = 0
+        self.cull_below = 0
+
+        # sprite centers before the last fixed update, for interpolated drawing
+        self.previous = {}
+
+        # blits of the last draw, shown by the profiler overlay
+        self.blits = 0
+
+    def add_internal(self, sprite, layer = None):
+        # new sprites get their rect after joining the group, so they are sorted in on the next draw
+        super().add_internal(sprite, layer)
+        self.new_sprites[sprite] = None
+
+    def remove_internal(self, sprite):
+        super().remove_internal(sprite)
+        if sprite in self.keys:
+            self.draw_list(sprite).remove(sprite, self.keys.pop(sprite))
+        else:
+            self.new_sprites.pop(sprite, None)
+
+    def draw_list(self, sprite):
+        return self.static if type(sprite).update is pygame.sprite.Sprite.update else self.moving
+
+    def measure(self, sprite):
+        self.cull_above = max(self.cull_above, sprite.image.get_height() - sprite.rect.height / 2)
+        self.cull_below = max(self.cull_below, sprite.rect.height / 2)
+
+    def insert(self, sprite):
+        key = sprite.rect.centery
+        self.keys[sprite] = key
+        self.draw_list(sprite).insert(sprite, key)
+        self.measure(sprite)
+
+    def snapshot(self):
+        self.previous = {sprite: sprite.rect.center for sprite in self.keys}
+
+    def position(self, sprite, alpha):
+        # center blended between the last two fixed updates
+        previous = self.previous.get(sprite)
+        if previous is None:
+            return sprite.rect.center
+        return (previous[0] + (sprite.rect.centerx - previous[0]) * alpha,
+                previous[1] + (sprite.rect.centery - previous[1]) * alpha)
+
+    def update_draw_order(self):
+        for sprite in self.new_sprites:
+            self.insert(sprite)
+        self.new_sprites.clear()
+
+        # moved sprites are measured again, their image can have changed with them
+        moved = [sprite for sprite, key in zip(self.moving.sprites, self.moving.keys) if sprite.rect.centery != key]
+        if len(moved) * 8 > len(self.moving):
+            # when more than an eighth of them moved, one sort of the list beats moving each one
+            for sprite in moved:
+                self.keys[sprite] = sprite.rect.centery
+                self.measure(sprite)
+            order = sorted(zip(map(self.keys.__getitem__, self.moving.sprites), self.moving.sprites), key = itemgetter(0))
+            self.moving.keys = [key for key, _ in order]
+            self.moving.sprites = [sprite for _, sprite in order]
+        else:
+            for sprite in moved:
+                self.moving.remove(sprite, self.keys[sprite])
+                self.insert(sprite)
+
+    def draw(self, target, alpha = 1):
+        target_pos = self.position(target, alpha) if alpha < 1 else target.rect.center
         self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
         self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
+        self.view.topleft = -self.offset
+
+        self.blits = self.ground.draw(self.display_surface, self.offset) if self.ground else 0
 
-        ground_sprites = [sprite for sprite in self if hasattr(sprite, 'ground')] 
-        object_sprites = [sprite for sprite in self if not hasattr(sprite, 'ground')] 
-        
-        for layer in [ground_sprites, object_sprites]:
-            for sprite in sorted(layer, key = lambda sprite: sprite.rect.centery):
-                self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
\ No newline at end of file
+        # only the band of sprites whose image can reach the viewport is checked,
+        # the static and moving bands are merged in y order
+        self.update_draw_order()
+        top, bottom = self.view.top - self.cull_above, self.view.bottom + self.cull_below
+        for _, sprite in merge(self.static.band(top, bottom), self.moving.band(top, bottom), key = itemgetter(0)):
+            # the image is drawn at rect.topleft and can be larger than the rect
+            if self.view.colliderect(sprite.rect.topleft, sprite.image.get_size()):
+                if alpha < 1:
+                    center = self.position(sprite, alpha)
+                    self.display_surface.blit(sprite.image, (center[0] - sprite.rect.width / 2 + self.offset.x, center[1] - sprite.rect.height / 2 + self.offset.y))
+                else:
+                    self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
+                self.blits += 1
@@ -0,0 +1,52 @@
+from settings import * 
+
+class TextLayout:
+    def __init__(self):
+        # word advance widths per font and finished line breaks per (font, text, width)
+        self.widths = {}
+        self.layouts = {}
+
+    def width(self, font, word):
+        key = (font, word)
+        if key not in self.widths:
+            self.widths[key] = font.size(word)[0]
+        return self.widths[key]
+
+    def wrap(self, font, text, max_width, paragraph_gap = False):
+        # '\n' ends a paragraph, paragraph_gap puts an empty line between paragraphs
+        key = (font, text, max_width, paragraph_gap)
+        if key not in self.layouts:
+            space_width = self.width(font, ' ')
+            lines = []
+            for paragraph in text.split('\n'):
+                if paragraph_gap and lines:
+                    lines.append('')
+
+                current_line, line_width = [], 0
+                for word in paragraph.split():
+                    word_width = self.width(font, word)
+                    if current_line and line_width + space_width + word_width > max_width:
+                        lines.append(' '.join(current_line))
+                        current_line, line_width = [], 0
+                    line_width += word_width + (space_width if current_line else 0)
+                    current_line.append(word)
+                if current_line:
+                    lines.append(' '.join(current_line))
+            self.layouts[key] = lines
+        return self.layouts[key]
+
+    def render(self, font, lines, color, background, line_spacing, width = None):
+        # all lines centred on one opaque page, empty lines only take up space
+        line_height = font.get_height()
+        height = len(lines) * line_height + max(len(lines) - 1, 0) * line_spacing
+        width = width or max((self.width(font, line) for line in lines), default = 0)
+        page = pygame.Surface((width, height))
+        page.fill(background)
+
+        y = 0
+        for line in lines:
+            if line:
+                surf = font.render(line, True, color)
+                page.blit(surf, surf.get_rect(midtop = (width // 2, y)))
+            y += line_height + line_spacing
+        return page
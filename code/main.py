@@ -1,18 +1,67 @@
 from settings import *
 from player import Player
 from sprites import *
-from pytmx.util_pygame import load_pygame
 from groups import AllSprites
+from streaming import WorldStreamer
+from spawning import SpawnScheduler
+from collision import SpatialGrid, sweep_rect, sweep_mask
+from assets import assets
+from config import config
+from bundle import load_world
+from audio import AudioManager
+from text import TextCache
+from layout import TextLayout
+from controls import LiveControls, ScriptedControls, RecordingControls, ReplayControls, patrol
+from timing import game_time, rng
+from pool import SpritePool
+from batch import EntityBatch
+from flowfield import FlowField
+from profiler import FrameProfiler
 
-from random import randint, choice
+from argparse import ArgumentParser
+from os import environ
+import gc
+
+from random import randrange
 
 class Game:
-    def __init__(self):
+    def __init__(self, headless=False, fixed_step=False, controls=None, seed=None, record=None, streaming=STREAM_WORLD):
+        # headless runs simulate with a fixed timestep and no drawing, for soak and balance runs
+        self.headless = headless
+        self.streaming = streaming
+        self.controls = controls or LiveControls()
+        self.tick = 0
+        game_time.reset()
+
+        # recorded sessions step the same way as their headless replay, with the same random numbers
+        # and the flow field searched on the game thread
+        self.deterministic = headless or record is not None
+        self.fixed_step = fixed_step or self.deterministic
+        self.seed = randrange(1 << 32) if seed is None else seed
+        rng.seed(self.seed)
+        if record:
+            self.controls = RecordingControls(self.controls, record, self.seed)
+        if headless:
+            environ['SDL_VIDEODRIVER'] = 'dummy'
+            environ['SDL_AUDIODRIVER'] = 'dummy'
+
         # setup
         pygame.init()
         # Initialize mixer explicitly with higher quality
         pygame.mixer.pre_init(44100, -16, 2, 512)
         pygame.mixer.init()
+        self.audio = AudioManager()
+
+        # intro narration decodes in the background while the map and images load
+        self.intro_narration_paths = [
+            join('audio', 'intro_narration.mp3'),
+            join('audios', 'intro_narration.mp3'),
+            join('audio', 'intro_narration.wav'),
+            join('audios', 'intro_narration.wav'),
+            'intro_narration.mp3'
+        ]
+        if not headless:
+            self.audio.prefetch('intro', self.intro_narration_paths)
         self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption('The Legend of Gazi Pir')
         self.clock = pygame.time.Clock()
@@ -28,16 +77,21 @@ class Game:
         self.show_mission_complete = False
 
         # UI Font
-        self.ui_font = pygame.font.Font(None, 36)
+        self.text = TextCache()
+        self.layout = TextLayout()
+        self.ui_font = self.text.font(36)
+
+        # F3 toggles the per-phase profiler overlay, F4 dumps its frames as a Chrome trace
+        self.profiler = FrameProfiler()
         
         # Intro narration setup
-        self.intro_playing = True
+        self.intro_playing = not headless
         self.intro_start_time = pygame.time.get_ticks()
         self.intro_duration = 79000  # 1 minute 17 seconds in milliseconds
         
         # Intro background and text
         self.intro_background_color = pygame.Color('#f0e2bd')  # Yellowish/brownish white like old paper
-        self.intro_font = pygame.font.Font(None, 36)
+        self.intro_font = self.text.font(36)
         self.intro_text = [
             "In the heart of Bengal, where the rivers kiss the forests and the air hums with forgotten songs, there lived a man unlike any other.",
             "His name was Gazi Pir, a warrior, a mystic, and a protector of beasts and people alike.",
@@ -48,261 +102,165 @@ class Game:
             "Step into the forest. The spirits await."
         ]
         
-        # Prepare for text scrolling effect
-        self.text_surfaces = []
-        for line in self.intro_text:
-            words = line.split()
-            lines = []
-            current_line = []
-            
-            # Wrap text to fit screen width (70% of screen)
-            line_width = 0
-            max_width = int(WINDOW_WIDTH * 0.7)
-            
-            for word in words:
-                word_surface = self.intro_font.render(word, True, (50, 40, 30))
-                word_width = word_surface.get_width()
-                
-                if line_width + word_width <= max_width:
-                    current_line.append(word)
-                    line_width += word_width + self.intro_font.size(' ')[0]
-                else:
-                    lines.append(' '.join(current_line))
-                    current_line = [word]
-                    line_width = word_width + self.intro_font.size(' ')[0]
-            
-            if current_line:
-                lines.append(' '.join(current_line))
-            
-            for wrapped_line in lines:
-                text_surf = self.intro_font.render(wrapped_line, True, (50, 40, 30))
-                self.text_surfaces.append(text_surf)
-        
-        # Add spacing between paragraphs
-        temp_surfaces = []
-        for i, surf in enumerate(self.text_surfaces):
-            temp_surfaces.append(surf)
-            if i < len(self.text_surfaces) - 1 and i + 1 in [len(line.split()) for line in self.intro_text]:
-                # Add blank line for paragraph separation
-                blank = self.intro_font.render(' ', True, (50, 40, 30))
-                temp_surfaces.append(blank)
-        
-        self.text_surfaces = temp_surfaces
-
-        # Load intro narration audio
-        try:
-            self.intro_narration = pygame.mixer.Sound(join('audio', 'intro_narration.mp3'))
-            self.intro_narration.set_volume(0.7)  # Set volume (adjust as needed)
-            print("Successfully loaded intro narration audio")
-        except Exception as e:
-            print(f"Error loading intro narration: {e}")
-            # Fallback - try with different path or file name
-            try:
-                # Try alternate paths
-                alt_paths = [
-                    join('audios', 'intro_narration.mp3'),  # You mentioned "audios" folder
-                    join('audio', 'intro_narration.wav'),
-                    join('audios', 'intro_narration.wav'),
-                    'intro_narration.mp3'
-                ]
-                
-                for path in alt_paths:
-                    try:
-                        print(f"Trying alternate path: {path}")
-                        self.intro_narration = pygame.mixer.Sound(path)
-                        self.intro_narration.set_volume(0.7)
-                        print(f"Successfully loaded from {path}")
-                        break
-                    except:
-                        continue
-            except Exception as e2:
-                print(f"All fallback attempts failed: {e2}")
-                # Create a dummy sound to prevent errors
-                self.intro_narration = pygame.mixer.Sound(join('audio', 'shoot.wav'))
-                self.intro_narration.set_volume(0)
+        # Prepare for text scrolling effect, wrapped to 70% of the screen with a blank line between paragraphs
+        intro_lines = self.layout.wrap(self.intro_font, '\n'.join(self.intro_text), int(WINDOW_WIDTH * 0.7), paragraph_gap=True)
+        self.intro_page = self.layout.render(self.intro_font, intro_lines, (50, 40, 30), self.intro_background_color, 10, WINDOW_WIDTH)
+        self.intro_height = self.intro_page.get_height()
+        intro_text_width = max(self.layout.width(self.intro_font, line) for line in intro_lines)
+        self.intro_column = pygame.Rect(0, 0, intro_text_width + 2, WINDOW_HEIGHT)
+        self.intro_column.centerx = WINDOW_WIDTH // 2
+        self.intro_y = None
+
+        # composed frame behind a modal scroll page, the world is paused while it is open
+        self.modal_frame = None
+        self.profiler_rect = None
 
         # groups 
         self.all_sprites = AllSprites()
-        self.collision_sprites = pygame.sprite.Group()
         self.bullet_sprites = pygame.sprite.Group()
         self.enemy_sprites = pygame.sprite.Group()
         self.scroll_sprites = pygame.sprite.Group()
         self.tiger_sprites = pygame.sprite.Group()
+        self.enemy_grid = SpatialGrid(())
 
         # gun timer
         self.can_shoot = True
         self.shoot_time = 0 
-        self.gun_cooldown = 100
-
-        # enemy timer 
-        self.enemy_event = pygame.event.custom_type()
-        pygame.time.set_timer(self.enemy_event, 300)
-        self.spawn_positions = []
-        self.used_spawn_positions = set()
+        self.gun_cooldown = config.archetype('gun').cooldown
 
         #scroll
         self.reading_scroll = False
+        self.scroll_color = pygame.Color('#f0e2bd')
         self.scroll_overlay = pygame.Surface((WINDOW_WIDTH - 100, WINDOW_HEIGHT - 100))
-        self.scroll_overlay.fill(pygame.Color('#f0e2bd'))
-        self.scroll_font = pygame.font.Font(None, 32)
-        self.scroll_title_font = pygame.font.Font(None, 42)
+        self.scroll_overlay.fill(self.scroll_color)
+        self.scroll_overlay_rect = self.scroll_overlay.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+        self.close_button = pygame.Rect(0, 0, 100, 40)
+        self.close_button.bottomright = (self.scroll_overlay_rect.right - 20, self.scroll_overlay_rect.bottom - 20)
+        self.scroll_font = self.text.font(32)
+        self.scroll_title_font = self.text.font(42)
+        self.complete_font = self.text.font(72)
         self.scroll_text = ""
         self.scroll_title = ""
-        self.scroll_narration = None
         self.current_scroll_id = 0
         
         # audio 
-        self.shoot_sound = pygame.mixer.Sound(join('audio', 'shoot.wav'))
-        self.shoot_sound.set_volume(0.2)
-        self.impact_sound = pygame.mixer.Sound(join('audio', 'impact.ogg'))
-        self.tiger_growl = pygame.mixer.Sound(join('audio', 'tiger_growl.mp3'))
-        
-         
-
-        # Background music
-        try:
-            self.music = pygame.mixer.Sound(join('audio', 'background_music.mp3'))
-            self.music.set_volume(0.3)  # Set at a lower volume (adjust as needed)
-            print("Successfully loaded background music")
-        except Exception as e:
-            print(f"Error loading background music: {e}")
-            # Try alternate paths if the first attempt fails
-            try:
-                alternate_paths = [
-                    join('audios', 'background_music.mp3'),
-                    'background_music.mp3'
-                ]
-                for path in alternate_paths:
-                    try:
-                        print(f"Trying alternate path: {path}")
-                        self.music = pygame.mixer.Sound(path)
-                        self.music.set_volume(0.3)
-                        print(f"Successfully loaded from {path}")
-                        break
-                    except:
-                        continue
-            except Exception as e2:
-                print(f"Failed to load background music: {e2}")
-                # Fallback to empty sound to prevent errors
-                self.music = pygame.mixer.Sound(join('audio', 'shoot.wav'))
-                self.music.set_volume(0)
-        
+        self.shoot_sound = self.audio.sfx(join('audio', 'shoot.wav'), 0.2)
+        self.impact_sound = self.audio.sfx(join('audio', 'impact.ogg'))
+        self.tiger_growl = self.audio.sfx(join('audio', 'tiger_growl.mp3'))
+
         # Play background music on loop immediately
-        self.music.play(loops=-1)
+        self.audio.play_music([
+            join('audio', 'background_music.mp3'),
+            join('audios', 'background_music.mp3'),
+            'background_music.mp3'
+        ], 0.3)
 
         # setup
+        map = load_world(join('data', 'maps', 'world.tmx'))
         self.load_images()
-        self.setup()
-        print(f'Scrolls added: {len(self.scroll_sprites)}')
+        self.setup(map)
+        # the loaded world lives for the whole game, collections no longer walk it
+        gc.collect()
+        gc.freeze()
+        print(f'Scrolls added: {self.world.scroll_count}')
+        for line in assets.report():
+            print(f'Assets {line}')
 
     def load_images(self):
-        self.bullet_surf = pygame.image.load(join('images', 'gun', 'bullet.png')).convert_alpha()
+        self.bullet_surf = assets.image(join('images', 'gun', 'bullet.png'))
+        self.bullet_mask = pygame.mask.from_surface(self.bullet_surf)
 
         folders = list(walk(join('images', 'enemies')))[0][1]
-        self.enemy_frames = {}
-        for folder in folders:
-            for folder_path, _, file_names in walk(join('images', 'enemies', folder)):
-                self.enemy_frames[folder] = []
-                for file_name in sorted(file_names, key = lambda name: int(name.split('.')[0])):
-                    full_path = join(folder_path, file_name)
-                    surf = pygame.image.load(full_path).convert_alpha()
-                    self.enemy_frames[folder].append(surf)
+        self.enemy_frames = assets.atlas('enemies', {folder: join('images', 'enemies', folder) for folder in folders})
+        self.enemy_masks = {folder: [pygame.mask.from_surface(surf) for surf in frames] for folder, frames in self.enemy_frames.items()}
         self.tiger_images = {
-            'caged': pygame.image.load(join('images', 'Tiger', 'caged.png')).convert_alpha(),
-            'uncaged': pygame.image.load(join('images', 'Tiger', 'uncaged.png')).convert_alpha()
+            'caged': assets.image(join('images', 'tiger', 'caged.png')),
+            'uncaged': assets.image(join('images', 'tiger', 'uncaged.png'))
         }
+        self.scroll_surf = assets.image(join('images', 'scroll', '0.png'))
 
     def render_intro(self):
-        # Fill background with old paper color
-        self.display_surface.fill(self.intro_background_color)
-        
         # Calculate scroll position based on time elapsed
         current_time = pygame.time.get_ticks()
         elapsed = current_time - self.intro_start_time
         
-        # Calculate total text height
-        total_height = sum(surf.get_height() for surf in self.text_surfaces) + (len(self.text_surfaces) - 1) * 10
-        
         # Calculate how far the text should have scrolled
         # Start offscreen at the bottom and scroll up over the duration
         scroll_progress = elapsed / self.intro_duration
         start_y = WINDOW_HEIGHT
-        end_y = -total_height
-        current_y = start_y + (end_y - start_y) * scroll_progress
+        end_y = -self.intro_height
+        current_y = int(start_y + (end_y - start_y) * scroll_progress)
         
-        # Draw each line of text
-        y_pos = current_y
-        for surf in self.text_surfaces:
-            x_pos = (WINDOW_WIDTH - surf.get_width()) // 2
-            self.display_surface.blit(surf, (x_pos, y_pos))
-            y_pos += surf.get_height() + 10  # Add spacing between lines
+        # Only the window of the pre-rendered text that is on screen is blitted,
+        # the rest of the screen is filled with the old paper color
+        # the paper around the text never changes, after the first frame only the column the
+        # text scrolls through is drawn and pushed to the screen, and only when it has moved
+        dirty = None
+        if current_y != self.intro_y:
+            dirty = self.display_surface.get_rect() if self.intro_y is None else self.intro_column
+            self.intro_y = current_y
+            visible = pygame.Rect(0, max(-current_y, 0), WINDOW_WIDTH, WINDOW_HEIGHT).clip(self.intro_page.get_rect())
+            top = max(current_y, 0)
+            self.display_surface.set_clip(dirty)
+            self.display_surface.fill(self.intro_background_color, (0, 0, WINDOW_WIDTH, top))
+            self.display_surface.blit(self.intro_page, (0, top), visible)
+            self.display_surface.fill(self.intro_background_color, (0, top + visible.height, WINDOW_WIDTH, WINDOW_HEIGHT))
+            self.display_surface.set_clip(None)
         
         # Check if intro is finished
         if elapsed >= self.intro_duration:
             self.intro_playing = False
-            self.intro_narration.stop()  # Stop narration when intro is done
+            self.audio.stop_narration()  # Stop narration when intro is done
             
         # Handle skip with any key or mouse click
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
                 self.intro_playing = False
-                self.intro_narration.stop()  # Stop narration if game is quit
+                self.audio.stop_narration()  # Stop narration if game is quit
             elif event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
                 self.intro_playing = False
-                self.intro_narration.stop()  # Stop narration if intro is skipped
+                self.audio.stop_narration()  # Stop narration if intro is skipped
         
-        pygame.display.update()
+        if dirty:
+            pygame.display.update(dirty)
 
     def scroll_collision(self):
         scroll_hit_list = pygame.sprite.spritecollide(self.player, self.scroll_sprites, True)
         if scroll_hit_list:
             scroll = scroll_hit_list[0]
             self.reading_scroll = True
-            self.scroll_text = scroll.text  # Get text from scroll
-            self.scroll_title = scroll.title  # Get title from scroll
             self.current_scroll_id = scroll.scroll_id  # Get scroll ID
-            self.scroll_start_time = pygame.time.get_ticks()
+            self.world.collect(scroll)
+            self.scroll_title, self.scroll_text = config.scroll(scroll.scroll_id)  # Read title and text from the config
+            self.scroll_start_time = game_time.get_ticks()
             self.collected_scrolls += 1  # Increment collected scrolls counter
             
-            # Play scroll narration audio
-            try:
-                # Stop any currently playing narration
-                if self.scroll_narration:
-                    self.scroll_narration.stop()
-                
-                # Load and play the new narration
-                narration_path = join('audios', f'scroll{self.current_scroll_id}.mp3')
-                self.scroll_narration = pygame.mixer.Sound(narration_path)
-                self.scroll_narration.play()
-                print(f"Playing scroll {self.current_scroll_id} narration")
-            except Exception as e:
-                print(f"Error loading scroll narration: {e}")
-                # Try alternate paths if the first attempt fails
-                try:
-                    alternate_paths = [
-                        join('audio', f'scroll{self.current_scroll_id}.mp3'),
-                        f'scroll{self.current_scroll_id}.mp3'
-                    ]
-                    for path in alternate_paths:
-                        try:
-                            self.scroll_narration = pygame.mixer.Sound(path)
-                            self.scroll_narration.play()
-                            print(f"Successfully loaded from {path}")
-                            break
-                        except:
-                            continue
-                except Exception as e2:
-                    print(f"Failed to load scroll narration: {e2}")
+            # Play scroll narration audio, usually decoded already by prefetch_narrations
+            self.audio.play_narration(f'scroll{self.current_scroll_id}', self.scroll_narration_paths(self.current_scroll_id))
                     
             self.check_mission_complete()  # Check if mission is complete
 
+    def scroll_narration_paths(self, scroll_id):
+        return [
+            join('audios', f'scroll{scroll_id}.mp3'),
+            join('audio', f'scroll{scroll_id}.mp3'),
+            f'scroll{scroll_id}.mp3'
+        ]
+
+    def prefetch_narrations(self):
+        # start decoding a scroll's narration before the player reaches it
+        player_pos = pygame.Vector2(self.player.rect.center)
+        for scroll in self.scroll_sprites:
+            if player_pos.distance_to(scroll.rect.center) < NARRATION_PREFETCH_DISTANCE:
+                self.audio.prefetch(f'scroll{scroll.scroll_id}', self.scroll_narration_paths(scroll.scroll_id))
+
     def handle_tigers(self):
         # Check for collisions with tigers
         tiger_collisions = pygame.sprite.spritecollide(self.player, self.tiger_sprites, False)
         
         # If player is colliding with a tiger and right-clicks, uncage it
-        if tiger_collisions and pygame.mouse.get_pressed()[2]:
+        if tiger_collisions and self.controls.state.interact:
             for tiger in tiger_collisions:
                 # Only count if tiger is currently caged
                 if tiger.is_caged:
@@ -316,7 +274,7 @@ class Game:
             self.uncaged_tigers >= self.total_tigers and 
             not self.mission_complete):
             self.mission_complete = True
-            self.mission_complete_time = pygame.time.get_ticks()
+            self.mission_complete_time = game_time.get_ticks()
             self.show_mission_complete = True
             print("Mission Complete!")
 
@@ -325,125 +283,248 @@ class Game:
         scrolls_text = f"Scrolls: {self.collected_scrolls}/{self.total_scrolls}"
         tigers_text = f"Tigers: {self.uncaged_tigers}/{self.total_tigers}"
         
-        # Create text surfaces with shadow for better visibility
-        scrolls_shadow = self.ui_font.render(scrolls_text, True, (0, 0, 0))
-        scrolls_surface = self.ui_font.render(scrolls_text, True, (255, 255, 255))
-        tigers_shadow = self.ui_font.render(tigers_text, True, (0, 0, 0))
-        tigers_surface = self.ui_font.render(tigers_text, True, (255, 255, 255))
-        
-        # Draw shadow text slightly offset
-        self.display_surface.blit(scrolls_shadow, (22, 22))
-        self.display_surface.blit(scrolls_surface, (20, 20))
-        self.display_surface.blit(tigers_shadow, (22, 62))
-        self.display_surface.blit(tigers_surface, (20, 60))
+        # Text surfaces with shadow for better visibility, only rendered again when a counter changes
+        self.display_surface.blit(self.text.render(self.ui_font, scrolls_text, (0, 0, 0)), (22, 22))
+        self.display_surface.blit(self.text.render(self.ui_font, scrolls_text, (255, 255, 255)), (20, 20))
+        self.display_surface.blit(self.text.render(self.ui_font, tigers_text, (0, 0, 0)), (22, 62))
+        self.display_surface.blit(self.text.render(self.ui_font, tigers_text, (255, 255, 255)), (20, 60))
         
         # Draw mission complete message if applicable
         if self.show_mission_complete:
-            # Center of screen
-            complete_text = "MISSION COMPLETE!"
-            complete_surface = pygame.font.Font(None, 72).render(complete_text, True, (255, 215, 0))
-            complete_rect = complete_surface.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50))
-            
-            # Create a semi-transparent background
-            overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-            self.display_surface.blit(overlay, (0, 0))
-            
-            # Draw the text with shadow for better visibility
-            shadow_surface = pygame.font.Font(None, 72).render(complete_text, True, (0, 0, 0))
-            shadow_rect = shadow_surface.get_rect(center=(WINDOW_WIDTH // 2 + 3, WINDOW_HEIGHT // 2 - 47))
-            self.display_surface.blit(shadow_surface, shadow_rect)
-            self.display_surface.blit(complete_surface, complete_rect)
+            self.display_surface.blit(self.text.cached('mission_complete', self.render_mission_complete), (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
             
             # Auto-hide after 5 seconds
-            if pygame.time.get_ticks() - self.mission_complete_time > 20000:
+            if game_time.get_ticks() - self.mission_complete_time > 20000:
                 self.show_mission_complete = False
 
+    def render_mission_complete(self):
+        # Semi-transparent background with the message composited on top,
+        # premultiplied so that one blit matches drawing the layers one by one
+        overlay = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 128))  # Semi-transparent black
+        
+        # Center of screen, with shadow for better visibility
+        complete_text = "MISSION COMPLETE!"
+        shadow_surface = self.complete_font.render(complete_text, True, (0, 0, 0)).premul_alpha()
+        overlay.blit(shadow_surface, shadow_surface.get_rect(center=(WINDOW_WIDTH // 2 + 3, WINDOW_HEIGHT // 2 - 47)), special_flags=pygame.BLEND_PREMULTIPLIED)
+        complete_surface = self.complete_font.render(complete_text, True, (255, 215, 0)).premul_alpha()
+        overlay.blit(complete_surface, complete_surface.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2 - 50)), special_flags=pygame.BLEND_PREMULTIPLIED)
+        return overlay
+
+    def render_scroll_page(self):
+        page = self.scroll_overlay.copy()
+        page_rect = page.get_rect()
+        
+        # Draw scroll title
+        title_surface = self.scroll_title_font.render(self.scroll_title, True, (139, 69, 19))  # Brown color
+        title_rect = title_surface.get_rect(midtop=(page_rect.centerx, page_rect.top + 20))
+        page.blit(title_surface, title_rect)
+        
+        # Draw close button
+        close_button = self.close_button.move(-self.scroll_overlay_rect.left, -self.scroll_overlay_rect.top)
+        pygame.draw.rect(page, (139, 69, 19), close_button, border_radius=5)
+        close_text = self.scroll_font.render("Close", True, (255, 255, 255))
+        page.blit(close_text, close_text.get_rect(center=close_button.center))
+        
+        # Draw wrapped text
+        lines = self.layout.wrap(self.scroll_font, self.scroll_text, page_rect.width - 60)  # Margin on both sides
+        text_surface = self.layout.render(self.scroll_font, lines, (0, 0, 0), self.scroll_color, 5)  # Space between lines
+        page.blit(text_surface, text_surface.get_rect(midtop=(page_rect.centerx, title_rect.bottom + 20)))
+        return page
+
     def input(self):
-        if pygame.mouse.get_pressed()[0] and self.can_shoot:
+        if self.controls.state.fire and self.can_shoot:
             self.shoot_sound.play()
             pos = self.gun.rect.center + self.gun.player_direction * 50
-            Bullet(self.bullet_surf, pos, self.gun.player_direction, (self.all_sprites, self.bullet_sprites))
+            bullet = self.bullet_pool.spawn(self.bullet_surf, self.bullet_mask, pos, self.gun.player_direction)
+            if self.batch:
+                self.batch.add_bullet(bullet)
             self.can_shoot = False
-            self.shoot_time = pygame.time.get_ticks()
+            self.shoot_time = game_time.get_ticks()
 
     def gun_timer(self):
         if not self.can_shoot:
-            current_time = pygame.time.get_ticks()
+            current_time = game_time.get_ticks()
             if current_time - self.shoot_time >= self.gun_cooldown:
                 self.can_shoot = True
 
-    def setup(self):
-        map = load_pygame(join('data', 'maps', 'world.tmx'))
+    def setup(self, map):
+        # the map is split into regions, only the ones near the player are instantiated
+        self.world = WorldStreamer(map, self, self.streaming)
+        self.all_sprites.ground = self.world.ground
+        self.collision_grid = SpatialGrid(())
+        self.flow_field = FlowField(map.width, map.height, self.world.obstacles,
+                                    workers=0 if self.deterministic else AI_WORKERS)
 
-        for x, y, image in map.get_layer_by_name('Ground').tiles():
-            Sprite((x * TILE_SIZE,y * TILE_SIZE), image, self.all_sprites)
-        
-        for obj in map.get_layer_by_name('Objects'):
-            CollisionSprite((obj.x, obj.y), obj.image, (self.all_sprites, self.collision_sprites))
-        
-        for obj in map.get_layer_by_name('Collisions'):
-            CollisionSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
-        
-        # Define scroll titles and detailed texts
-        scroll_titles = [
-            "The Guardian of the Forest",
-            "The Man Who Rode Tigers",
-            "The Protector of the People",
-            "His Healing Touch",
-            "The Legend Lives On"
-        ]
-        
-        scroll_texts = [
-            "Long ago, when tigers roamed freely and men feared the Sundarbans, Gazi Pir arrived not with a sword, but with peace in his heart. He tamed the beasts not through force, but through faith. It is said that tigers bowed their heads before him, recognizing his spirit as one of the wild and the divine. Even today, when a tiger spares a traveler, they whisper, 'Gazi is watching.'",
-            
-            "People say Gazi Pir rode a tiger the way others ride horses.\nWearing green and gold, he would travel through the mangrove forests, watching over those who lived there.\nThe forests could be wild and unpredictable, but Gazi Pir brought calm and protection wherever he went.\nSome believed the tigers followed him not out of fear, but because he understood them.\nHe didn't see them as dangerous animals; he saw them as protectors of nature, just like him.\nHe moved through the trees like he belonged there, quietly helping those in need.\nHis story lives on in quiet whispers, carried by the wind and remembered by the forest.",
-            
-            "When the rivers swelled and floods came close to the villages, people would look to Gazi Pir.\nThey say he would stand by the water's edge, lifting his arms to the sky as if in quiet prayer.\nSomehow, the waters would settle. The rains would ease. Crops began to grow again.\nTo those who lived near the forest and rivers, this felt like hope.\nThey believed Gazi Pir could connect with nature, not through power, but through understanding.\nHe didn't fight the storms, but asked for peace in a way only he could.\nEven now, before the heavy rains of monsoon, many farmers still pause to remember him.\nSome leave small offerings, some whisper a prayer, not out of fear, but from old habits of trust.\nBecause once, long ago, someone listened when the rivers spoke.",
-            
-            "In many villages near the Sundarbans, stories are still told of Gazi Pir's healing touch. It's said that when someone was bitten by a snake, their family would place soil from near his shrine into water, and give it to the person to drink. Sometimes, they would tie a thread around the bite, whispering his name as a prayer. People believed that Gazi's blessings could draw out the poison, especially when help was far away.\nEven today, some still visit his shrines during illness, lighting candles or offering flowers. Whether through faith or tradition, the belief in Gazi Pir's protection has been passed down for generations and remembered in the quiet hopes of those who seek comfort in his name.",
-            
-            "Some people say Gazi Pir never truly passed away.\nThat he still moves through the Sundarbans, in the quiet of the trees, in the sound of the wind, and even in the call of a tiger.\nHis presence isn't loud or grand, but something that people feel when they walk through the forests or sit by the rivers.\nThere are small shrines to him here and simple places where people light candles or leave flowers. They don't ask for miracles. Just protection, guidance, maybe a little peace.\nThe scroll you hold now is just one part of a bigger story.\nOthers have pieces too, like old songs, quiet prayers, and memories passed down over time.\nGazi Pir's story doesn't live in one place. It continues through those who still remember and share it.\nNot in books, but in the people who quietly carry his story with them."
-        ]
+        self.player = Player(self.world.player_pos, self.all_sprites, self.collision_grid, self.controls)
+        self.gun = Gun(self.player, self.all_sprites)
+
+        # enemies and bullets are recycled instead of rebuilt on every spawn and shot
+        self.enemy_pool = SpritePool(Enemy, (self.all_sprites, self.enemy_sprites), self.player, self.collision_grid, self.flow_field)
+        self.bullet_pool = SpritePool(Bullet, (self.all_sprites, self.bullet_sprites))
+        self.batch = EntityBatch(self.player, self.collision_grid, self.flow_field) if BATCH_UPDATE and EntityBatch.available else None
+
+        # loaded regions hand their spawn points to the scheduler
+        self.spawner = SpawnScheduler(self)
+        self.world.start(self.player.rect.center)
 
-        scroll_index = 0
-        for obj in map.get_layer_by_name('Entities'):
-            if obj.name == 'Player':
-                self.player = Player((obj.x,obj.y), self.all_sprites, self.collision_sprites)
-                self.gun = Gun(self.player, self.all_sprites)
-            elif obj.name == 'Enemy':
-                self.spawn_positions.append((obj.x, obj.y))
-            elif obj.name == 'Scroll':
-                if scroll_index < len(scroll_texts):
-                    scroll_image = pygame.image.load(join('images', 'scroll', '0.png')).convert_alpha()
-                    ScrollSprite(
-                        (obj.x, obj.y), 
-                        scroll_image, 
-                        (self.all_sprites, self.scroll_sprites), 
-                        scroll_texts[scroll_index],
-                        scroll_titles[scroll_index],
-                        scroll_index + 1  # Scroll ID (1-5)
-                    )
-                    scroll_index += 1
-            elif obj.name == 'Tiger':
-                Tiger((obj.x, obj.y), self.tiger_images, 
-                    (self.all_sprites, self.tiger_sprites), 
-                    self.collision_sprites,
-                    self.tiger_growl) 
     def bullet_collision(self):
+        # one pass over every bullet, each is swept along the segment it moved this frame
+        # so a slow frame cannot carry it past an enemy or through a wall
         if self.bullet_sprites:
-            for bullet in self.bullet_sprites:
-                collision_sprites = pygame.sprite.spritecollide(bullet, self.enemy_sprites, False, pygame.sprite.collide_mask)
-                if collision_sprites:
+            bullets = list(self.bullet_sprites)
+            if self.batch:
+                near_walls = self.batch.paths_obstructed([bullet.previous for bullet in bullets],
+                                                         [bullet.rect.center for bullet in bullets],
+                                                         [bullet.rect.size for bullet in bullets])
+            else:
+                near_walls = [True] * len(bullets)
+
+            for bullet, near_wall in zip(bullets, near_walls):
+                start, end, size = bullet.previous, bullet.rect.center, bullet.rect.size
+                path = bullet.rect.union(bullet.rect.move(start[0] - end[0], start[1] - end[1]))
+
+                # the first wall on the path stops the bullet, enemies behind it are safe
+                wall = None
+                if near_wall:
+                    distances = [sweep_rect(start, end, size, sprite.rect) for sprite in self.collision_grid.query(path)]
+                    wall = min((distance for distance in distances if distance is not None), default = None)
+
+                hits = []
+                for enemy in self.enemy_grid.query(path):
+                    distance = sweep_mask(start, end, bullet.mask, size, enemy, BULLET_SWEEP_STEP)
+                    if distance is not None and (wall is None or distance <= wall):
+                        hits.append((distance, enemy))
+                if hits:
+                    # every enemy the bullet overlaps where it first hits one
+                    first = min(distance for distance, _ in hits)
                     self.impact_sound.play()
-                    for sprite in collision_sprites:
-                        sprite.destroy()
+                    for distance, sprite in hits:
+                        if distance <= first + BULLET_SWEEP_STEP:
+                            sprite.destroy()
+                    bullet.kill()
+                elif wall is not None:
                     bullet.kill()
 
     def player_collision(self):
-        if pygame.sprite.spritecollide(self.player, self.enemy_sprites, False, pygame.sprite.collide_mask):
+        nearby_enemies = self.enemy_grid.query(self.player.rect)
+        if any(pygame.sprite.collide_mask(self.player, enemy) for enemy in nearby_enemies):
             self.running = False
 
+    def close_scroll(self):
+        # Check for close button click
+        if self.reading_scroll and self.controls.state.fire and self.close_button.collidepoint(self.controls.state.aim):
+            self.reading_scroll = False
+            self.audio.stop_narration()
+
+    def update(self, dt):
+        # one simulation step, shared by the windowed and the headless loop
+        if self.reading_scroll:
+            # the scroll page is modal, the world waits behind it until it is closed
+            self.tick += 1
+            self.controls.poll(self.tick, self)
+            self.close_scroll()
+            return
+        self.update_input(dt)
+        self.update_sprites(dt)
+        self.profiler.mark('sprites')
+        self.update_collisions()
+
+    def update_sprites(self, dt):
+        self.world.update(self.player.rect.center)
+        self.flow_field.update(self.player.rect.center)
+        self.all_sprites.update(dt)
+        if self.batch:
+            self.batch.update(dt)
+
+    def update_input(self, dt):
+        self.tick += 1
+        game_time.advance(dt)
+        self.controls.poll(self.tick, self)
+
+        # enemy waves
+        self.spawner.update()
+
+        self.gun_timer()
+        self.input()
+        self.profiler.mark('input')
+
+    def update_collisions(self):
+        self.enemy_grid.rebuild(self.enemy_sprites)
+        self.bullet_collision()
+        self.profiler.mark('bullets')
+        self.scroll_collision()
+        self.profiler.mark('scrolls')
+        self.handle_tigers()
+        self.close_scroll()
+        self.prefetch_narrations()
+        self.profiler.mark('tigers')
+        # self.player_collision()
+
+    def draw(self, alpha=1):
+        if self.reading_scroll:
+            self.draw_modal()
+            return
+        self.modal_frame = None
+
+        self.draw_world(alpha)
+        self.profiler.mark('draw')
+        self.draw_hud()
+        self.draw_profiler()
+        self.profiler.mark('hud')
+
+        # update display AFTER everything is drawn
+        pygame.display.update()
+        self.profiler.mark('display')
+
+    def draw_modal(self):
+        # nothing moves behind the scroll page, the frame is composed once and kept,
+        # afterwards only the profiler overlay is redrawn and pushed to the screen
+        if self.modal_frame is None:
+            self.draw_world()
+            self.draw_hud()
+            self.modal_frame = self.display_surface.copy()
+            self.profiler_rect = None
+            pygame.display.update()
+            return
+
+        dirty = []
+        if self.profiler_rect:
+            self.display_surface.blit(self.modal_frame, self.profiler_rect, self.profiler_rect)
+            dirty.append(self.profiler_rect)
+        self.profiler_rect = self.draw_profiler()
+        if self.profiler_rect:
+            dirty.append(self.profiler_rect)
+        self.profiler.mark('hud')
+        pygame.display.update(dirty)
+        self.profiler.mark('display')
+
+    def draw_world(self, alpha=1):
+        self.display_surface.fill('black')
+        self.all_sprites.draw(self.player, alpha)
+
+    def draw_hud(self):
+        # Draw mission status (scrolls/tigers counters)
+        self.draw_mission_status()
+
+        # Draw scroll overlay
+        if self.reading_scroll:
+            # Scroll box, title, close button and wrapped text are composited once per scroll
+            page = self.text.cached(('scroll', self.current_scroll_id), self.render_scroll_page)
+            self.display_surface.blit(page, self.scroll_overlay_rect)
+
+    def draw_profiler(self):
+        counts = {'sprites': len(self.all_sprites), 'enemies': len(self.enemy_sprites), 'bullets': len(self.bullet_sprites)}
+        return self.profiler.draw(self.display_surface, counts, self.all_sprites.blits)
+
+    def simulate(self, seconds):
+        # headless run as fast as possible with fixed steps, nothing is drawn
+        for _ in range(round(seconds / FIXED_DT)):
+            if not self.running:
+                break
+            pygame.event.pump()
+            self.update(FIXED_DT)
+
     def run(self):
         # Play intro sequence first
         narration_started = False
@@ -452,134 +533,74 @@ class Game:
             
             # Start intro narration if it's not already playing
             if not narration_started:
-                try:
-                    channel = self.intro_narration.play()
-                    print("Playing intro narration...")
-                    narration_started = True
-                except Exception as e:
-                    print(f"Error playing intro narration: {e}")
-                    narration_started = True  # Don't try again
+                self.audio.play_narration('intro', self.intro_narration_paths, 0.7)
+                narration_started = True
+            self.audio.update()
                 
             self.render_intro()
             
         # Main game loop
+        accumulator = 0
         while self.running:
             # dt 
-            dt = self.clock.tick() / 1000
+            # a modal scroll page only needs a few frames, the world runs uncapped,
+            # the wait for the cap is part of the profiled frame
+            self.profiler.begin()
+            dt = self.clock.tick(60 if self.reading_scroll else 0) / 1000
+            self.profiler.mark('wait')
 
             # event loop 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
-                if event.type == self.enemy_event:
-                    available_positions = [pos for pos in self.spawn_positions if pos not in self.used_spawn_positions]
-                    if available_positions:
-                        spawn_pos = choice(available_positions)
-                        self.used_spawn_positions.add(spawn_pos)
-                        Enemy(spawn_pos, choice(list(self.enemy_frames.values())), (self.all_sprites, self.enemy_sprites), self.player, self.collision_sprites)
-
-            # update 
-            self.gun_timer()
-            self.input()
-            self.all_sprites.update(dt)
-            self.bullet_collision()
-            self.scroll_collision()
-            self.handle_tigers()
-            # self.player_collision()
-
-            # draw
-            self.display_surface.fill('black')
-            self.all_sprites.draw(self.player.rect.center)
-            
-            # Draw mission status (scrolls/tigers counters)
-            self.draw_mission_status()
-
-            # Draw scroll overlay
-            if self.reading_scroll:
-                # Draw scroll background box
-                overlay_rect = self.scroll_overlay.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-                self.display_surface.blit(self.scroll_overlay, overlay_rect)
-                
-                # Draw scroll title
-                title_surface = self.scroll_title_font.render(self.scroll_title, True, (139, 69, 19))  # Brown color
-                title_rect = title_surface.get_rect(midtop=(overlay_rect.centerx, overlay_rect.top + 20))
-                self.display_surface.blit(title_surface, title_rect)
-                
-                # Draw close button
-                close_button = pygame.Rect(0, 0, 100, 40)
-                close_button.bottomright = (overlay_rect.right - 20, overlay_rect.bottom - 20)
-                pygame.draw.rect(self.display_surface, (139, 69, 19), close_button, border_radius=5)
-                close_text = self.scroll_font.render("Close", True, (255, 255, 255))
-                close_text_rect = close_text.get_rect(center=close_button.center)
-                self.display_surface.blit(close_text, close_text_rect)
-                
-                # Check for close button click
-                mouse_pos = pygame.mouse.get_pos()
-                mouse_clicked = pygame.mouse.get_pressed()[0]
-                if close_button.collidepoint(mouse_pos) and mouse_clicked:
-                    self.reading_scroll = False
-                    if self.scroll_narration:
-                        self.scroll_narration.stop()
-                
-                # Text wrapping for scroll content
-                max_width = overlay_rect.width - 60  # Margin on both sides
-                words = self.scroll_text.split()
-                lines = []
-                current_line = []
-                line_width = 0
-                
-                for word in words:
-                    # Handle newline characters in the text
-                    if "\n" in word:
-                        sub_words = word.split("\n")
-                        if current_line and sub_words[0]:  # Add first part to current line
-                            current_line.append(sub_words[0])
-                            lines.append(" ".join(current_line))
-                        elif sub_words[0]:  # First part is a line by itself
-                            lines.append(sub_words[0])
-                            
-                        # Add middle parts as separate lines
-                        for i in range(1, len(sub_words) - 1):
-                            if sub_words[i]:
-                                lines.append(sub_words[i])
-                                
-                        # Start new line with last part if it exists
-                        current_line = [sub_words[-1]] if sub_words[-1] else []
-                        line_width = self.scroll_font.size(sub_words[-1])[0] if sub_words[-1] else 0
-                        continue
-                        
-                    word_width = self.scroll_font.size(word)[0]
-                    space_width = self.scroll_font.size(" ")[0]
-                    
-                    if line_width + word_width + (space_width if current_line else 0) <= max_width:
-                        current_line.append(word)
-                        line_width += word_width + (space_width if line_width > 0 else 0)
-                    else:
-                        if current_line:  # Only add if there's text
-                            lines.append(" ".join(current_line))
-                        current_line = [word]
-                        line_width = word_width
-                
-                # Add the last line if there is one
-                if current_line:
-                    lines.append(" ".join(current_line))
-                
-                # Draw wrapped text
-                y_offset = title_rect.bottom + 20
-                for line in lines:
-                    if line.strip():  # Only render non-empty lines
-                        line_surf = self.scroll_font.render(line, True, (0, 0, 0))
-                        line_rect = line_surf.get_rect(midtop=(overlay_rect.centerx, y_offset))
-                        self.display_surface.blit(line_surf, line_rect)
-                        y_offset += line_surf.get_height() + 5  # Space between lines
-
-            # update display AFTER everything is drawn
-            pygame.display.update()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.profiler.toggle()
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                    self.profiler.dump('profile_trace.json')
+            self.profiler.mark('events')
+
+            if self.fixed_step:
+                # fixed updates, drawing blends between the last two of them
+                accumulator += min(dt, MAX_FRAME_TIME)
+                while accumulator >= FIXED_DT and self.running:
+                    self.all_sprites.snapshot()
+                    self.update(FIXED_DT)
+                    accumulator -= FIXED_DT
+                self.draw(accumulator / FIXED_DT)
+            else:
+                self.update(dt)
+                self.draw()
+            self.audio.update()
+            self.profiler.mark('audio')
+            self.profiler.end()
             
         # Stop music when game ends
-        self.music.stop()
+        self.controls.close()
+        self.audio.shutdown()
+        self.flow_field.shutdown()
         pygame.quit()
 
 if __name__ == '__main__':
-    game = Game()
-    game.run()
\ No newline at end of file
+    parser = ArgumentParser(description='The Legend of Gazi Pir')
+    parser.add_argument('--headless', type=float, metavar='SECONDS', help='simulate SECONDS of scripted play without a window')
+    parser.add_argument('--fixed-step', action='store_true', help='fixed timestep updates with interpolated drawing')
+    parser.add_argument('--seed', type=int, help='seed of the random numbers, random by default')
+    parser.add_argument('--record', metavar='FILE', help='write every tick of input to FILE, for --replay')
+    parser.add_argument('--replay', metavar='FILE', help='re-run a recorded session without a window, as fast as possible')
+    args = parser.parse_args()
+
+    if args.headless or args.replay:
+        if args.replay:
+            controls = ReplayControls(args.replay)
+            game = Game(headless=True, controls=controls, seed=controls.seed)
+            seconds = controls.ticks * FIXED_DT
+        else:
+            game = Game(headless=True, controls=ScriptedControls(patrol), seed=args.seed, record=args.record)
+            seconds = args.headless
+        game.simulate(seconds)
+        game.controls.close()
+        print(f'Simulated {game.tick} ticks: {len(game.enemy_sprites)} enemies, {len(game.bullet_sprites)} bullets, '
+              f'{game.collected_scrolls} scrolls, {game.uncaged_tigers} tigers, player at {tuple(game.player.rect.center)}')
+    else:
+        game = Game(fixed_step=args.fixed_step, seed=args.seed, record=args.record)
+        game.run()
\ No newline at end of file
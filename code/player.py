@@ -1,45 +1,42 @@
 from settings import * 
+from assets import assets
+from config import config
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, pos, groups, collision_sprites):
+    def __init__(self, pos, groups, collision_grid, controls):
         super().__init__(groups)
+        self.archetype = config.archetype('player')
         self.load_images()
         self.state, self.frame_index = 'right', 0
-        self.image = pygame.image.load(join('images', 'player', 'down', '0.png')).convert_alpha()
+        self.image = self.frames['down'][0]
+        self.mask = pygame.mask.from_surface(self.image)
         self.rect = self.image.get_frect(center = pos)
-        self.hitbox_rect = self.rect.inflate(-60, -90)
+        self.hitbox_rect = self.rect.inflate(self.archetype.hitbox)
     
         # movement 
         self.direction = pygame.Vector2()
-        self.speed = 500
-        self.collision_sprites = collision_sprites
+        self.collision_grid = collision_grid
+        self.controls = controls
 
     def load_images(self):
-        self.frames = {'left': [], 'right': [], 'up': [], 'down': []}
-
-        for state in self.frames.keys():
-            for folder_path, sub_folders, file_names in walk(join('images', 'player', state)):
-                if file_names:
-                    for file_name in sorted(file_names, key= lambda name: int(name.split('.')[0])):
-                        full_path = join(folder_path, file_name)
-                        surf = pygame.image.load(full_path).convert_alpha()
-                        self.frames[state].append(surf)
+        self.frames = assets.atlas('player', {state: join('images', 'player', state) for state in ('left', 'right', 'up', 'down')})
+        self.masks = {state: [pygame.mask.from_surface(surf) for surf in frames] for state, frames in self.frames.items()}
 
     def input(self):
-        keys = pygame.key.get_pressed()
-        self.direction.x = int(keys[pygame.K_RIGHT] or keys[pygame.K_d]) - int(keys[pygame.K_LEFT] or keys[pygame.K_a])
-        self.direction.y = int(keys[pygame.K_DOWN] or keys[pygame.K_s]) - int(keys[pygame.K_UP] or keys[pygame.K_w])
+        self.direction.x, self.direction.y = self.controls.state.move
         self.direction = self.direction.normalize() if self.direction else self.direction
 
     def move(self, dt):
-        self.hitbox_rect.x += self.direction.x * self.speed * dt
-        self.collision('horizontal')
-        self.hitbox_rect.y += self.direction.y * self.speed * dt
-        self.collision('vertical')
+        velocity = self.direction * self.archetype.speed * dt
+        obstacles = self.collision_grid.query(self.hitbox_rect.union(self.hitbox_rect.move(velocity)))
+        self.hitbox_rect.x += velocity.x
+        self.collision('horizontal', obstacles)
+        self.hitbox_rect.y += velocity.y
+        self.collision('vertical', obstacles)
         self.rect.center = self.hitbox_rect.center
 
-    def collision(self, direction):
-        for sprite in self.collision_sprites:
+    def collision(self, direction, obstacles):
+        for sprite in obstacles:
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0: self.hitbox_rect.right = sprite.rect.left
@@ -58,6 +55,7 @@ class Player(pygame.sprite.Sprite):
         # animate
         self.frame_index = self.frame_index + 5 * dt if self.direction else 0
         self.image = self.frames[self.state][int(self.frame_index) % len(self.frames[self.state])]
+        self.mask = self.masks[self.state][int(self.frame_index) % len(self.masks[self.state])]
 
     def update(self, dt):
         self.input()
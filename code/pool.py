@@ -0,0 +1,41 @@
+from settings import * 
+
+class SpritePool:
+    def __init__(self, cls, groups, *shared):
+        # killed sprites wait here, out of every group, until the next spawn reuses them
+        self.cls = cls
+        self.groups = groups
+        self.shared = shared
+        self.free = []
+        self.created = 0
+
+    def spawn(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.add(self.groups)
+            sprite.reset(*args)
+        else:
+            sprite = self.cls(*args, self.groups, *self.shared)
+            sprite.pool = self
+            self.created += 1
+        return sprite
+
+    def release(self, sprite):
+        self.free.append(sprite)
+
+class PooledSprite(pygame.sprite.Sprite):
+    __slots__ = ('pool', 'store', 'slot')
+
+    def __init__(self, groups):
+        # a sprite a pool can hand out again, optionally moved by a batch store while alive
+        super().__init__(groups)
+        self.pool = None
+        self.store = None
+
+    def kill(self):
+        # leaves its store and goes back to its pool, only once however often it is killed
+        if self.store is not None:
+            self.store.remove(self)
+        if self.pool and self.alive():
+            self.pool.release(self)
+        super().kill()
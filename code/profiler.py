@@ -0,0 +1,92 @@
+from settings import * 
+from collections import deque
+from time import perf_counter_ns
+import json
+
+class FrameProfiler:
+    def __init__(self, size = PROFILER_FRAMES):
+        # per-phase frame timings in a ring buffer, nothing is recorded while disabled
+        self.enabled = False
+        self.frames = deque(maxlen = size)
+        self.phases = []
+        self.start = self.last = 0
+
+        # overlay
+        self.font = pygame.font.Font(None, 22)
+        self.overlay = None
+        self.refresh_interval = 15
+        self.frames_since_refresh = 0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frames.clear()
+        self.overlay = None
+        self.begin()
+
+    def begin(self):
+        if self.enabled:
+            self.phases = []
+            self.start = self.last = perf_counter_ns()
+
+    def mark(self, phase):
+        # time since the previous mark is booked on this phase
+        if self.enabled:
+            now = perf_counter_ns()
+            self.phases.append((phase, self.last, now - self.last))
+            self.last = now
+
+    def end(self):
+        if self.enabled:
+            self.frames.append((self.start, perf_counter_ns() - self.start, self.phases))
+
+    def stats(self):
+        durations = sorted(duration for _, duration, _ in self.frames)
+        worst = durations[-max(len(durations) // 100, 1):]
+        phases = {}
+        for _, _, frame_phases in self.frames:
+            for phase, _, duration in frame_phases:
+                phases[phase] = phases.get(phase, 0) + duration
+        return (1e9 * len(durations) / sum(durations), 1e9 * len(worst) / sum(worst),
+                {phase: total / len(durations) / 1e6 for phase, total in phases.items()})
+
+    def render_overlay(self, counts, blits):
+        fps, low, phases = self.stats()
+        lines = [f'FPS {fps:.0f}   1% low {low:.0f}', f'world blits {blits}']
+        lines += [' '.join(f'{name} {count}' for name, count in counts.items())]
+        lines += [f'{phase:<9} {ms:6.2f} ms' for phase, ms in phases.items()]
+
+        graph_height = 60
+        overlay = pygame.Surface((300, 20 * len(lines) + graph_height + 20), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 180))
+        for index, line in enumerate(lines):
+            overlay.blit(self.font.render(line, True, (255, 255, 255)), (10, 10 + index * 20))
+
+        # frame time graph, the line marks 60 FPS
+        bottom = overlay.get_height() - 10
+        budget = bottom - graph_height / 2
+        for x, (_, duration, _) in enumerate(list(self.frames)[-280:]):
+            height = min(duration / 1e6 / (1000 / 60) * graph_height / 2, graph_height)
+            color = (90, 220, 90) if bottom - height > budget else (230, 80, 60)
+            pygame.draw.line(overlay, color, (10 + x, bottom), (10 + x, bottom - height))
+        pygame.draw.line(overlay, (255, 255, 255), (10, budget), (290, budget))
+        return overlay
+
+    def draw(self, surface, counts, blits):
+        if self.enabled and self.frames:
+            self.frames_since_refresh += 1
+            if self.overlay is None or self.frames_since_refresh >= self.refresh_interval:
+                self.overlay = self.render_overlay(counts, blits)
+                self.frames_since_refresh = 0
+            return surface.blit(self.overlay, (surface.get_width() - self.overlay.get_width() - 10, 10))
+        return None
+
+    def dump(self, path):
+        # chrome://tracing / Perfetto JSON of the frames in the ring buffer
+        events = []
+        for start, duration, phases in self.frames:
+            events.append({'name': 'frame', 'ph': 'X', 'pid': 0, 'tid': 0, 'ts': start / 1000, 'dur': duration / 1000})
+            for phase, phase_start, phase_duration in phases:
+                events.append({'name': phase, 'ph': 'X', 'pid': 0, 'tid': 0, 'ts': phase_start / 1000, 'dur': phase_duration / 1000})
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+        print(f'Wrote {len(self.frames)} frames to {path}')
@@ -0,0 +1,21 @@
+from settings import * 
+
+class RotationCache:
+    def __init__(self, surf, step = ROTATION_STEP):
+        # rotated copies of one surface keyed by angle quantized to step degrees,
+        # built lazily the first time an angle is needed
+        self.surf = surf
+        self.step = step
+        self.images = {}
+
+    def get(self, angle, flip = False):
+        key = (round(angle / self.step) * self.step % 360, flip)
+        if key not in self.images:
+            image = pygame.transform.rotozoom(self.surf, key[0], 1)
+            self.images[key] = pygame.transform.flip(image, False, True) if flip else image
+        return self.images[key]
+
+    def prebuild(self, flip = False):
+        # the whole table up front, for sprites that should never build one mid-game
+        for angle in range(0, 360, self.step):
+            self.get(angle, flip)
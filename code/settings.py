@@ -3,4 +3,28 @@ from os.path import join
 from os import walk
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280,720 
-TILE_SIZE = 64
\ No newline at end of file
+TILE_SIZE = 64
+CHUNK_SIZE = 8 # ground tiles per side of a pre-baked chunk
+COLLISION_CELL_SIZE = TILE_SIZE * 2 # cell size of the static collision grid
+NARRATION_PREFETCH_DISTANCE = 600 # scroll narrations start decoding when the player gets this close
+TEXT_CACHE_SIZE = 64 # rendered text surfaces kept by the text cache
+ROTATION_STEP = 2 # degrees between the pre-rotated images of a rotation cache
+FIXED_DT = 1 / 60 # simulation step of the fixed timestep loop, in seconds
+MAX_FRAME_TIME = 0.25 # longest frame the fixed timestep loop catches up on
+PROFILER_FRAMES = 600 # frames kept in the profiler ring buffer
+ENEMY_BUDGET = 10 # most enemies alive at once over every wave, dead ones are respawned
+BATCH_UPDATE = True # move enemies and bullets as numpy arrays when numpy is installed
+BATCH_CELL_SIZE = 16 # grid of the batch update's obstacle lookup
+FLOW_CLEARANCE = (54, 18) # half the enemy hitbox, the flow field keeps this far from obstacles
+AI_WORKERS = 1 # processes searching the enemy flow field, 0 searches on the game thread
+STREAM_WORLD = True # instantiate only the map regions near the player, False loads the whole map at start
+REGION_SIZE = CHUNK_SIZE * 2 # map tiles per side of a streamed region, a multiple of CHUNK_SIZE
+REGION_LOAD_MARGIN = TILE_SIZE * 4 # regions this far outside the view are loaded ahead of the player
+REGION_UNLOAD_MARGIN = TILE_SIZE * 12 # and unloaded once they are this far outside it
+REGION_LOADS_PER_FRAME = 1 # regions loaded ahead per update, the ones in view always load at once
+BULLET_SWEEP_STEP = 8 # pixels between the mask tests along a bullet's path, under half the bullet's width
+SPAWNS_PER_FRAME = 2 # most enemies instantiated in one update, the rest of a burst waits for the next ones
+SPAWN_CELL_SIZE = TILE_SIZE * 8 # cell size of the spawn point index
+SPAWN_RADIUS = 1600 # enemies spawn at points at most this far from the player
+SPAWN_VIEW_MARGIN = 100 # and never at points within this distance of the view
+FLOW_WINDOW = (SPAWN_RADIUS // TILE_SIZE + REGION_SIZE) * 2 + 2 # map tiles per side of the flow field window around the player
@@ -0,0 +1,116 @@
+from settings import * 
+from timing import game_time, rng
+from config import config, WAVES_PATH
+
+class Wave:
+    __slots__ = ('alive', 'interval', 'total', 'delay', 'types')
+
+    def __init__(self, alive, interval, total, delay, types, enemy_types):
+        # one entry of data/waves.json, a total of 0 respawns dead enemies for as long as the game runs
+        self.alive = alive
+        self.interval = config.archetype('enemy').cooldown if interval is None else interval
+        self.total = total
+        self.delay = delay
+        unknown = set(types) - set(enemy_types)
+        if unknown:
+            raise ValueError(f'{WAVES_PATH}: unknown enemy types {", ".join(sorted(unknown))}')
+        self.types = list(types or enemy_types)
+
+class SpawnIndex:
+    def __init__(self, cell_size = SPAWN_CELL_SIZE):
+        # spawn points bucketed by cell, only the cells around the player are looked at
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell(self, pos):
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def add(self, points):
+        for pos in points:
+            self.cells.setdefault(self.cell(pos), []).append(pos)
+
+    def remove(self, points):
+        for pos in points:
+            cell = self.cells[self.cell(pos)]
+            cell.remove(pos)
+            if not cell:
+                del self.cells[self.cell(pos)]
+
+    def points(self):
+        return [pos for cell in self.cells.values() for pos in cell]
+
+    def around(self, center, radius = SPAWN_RADIUS, margin = SPAWN_VIEW_MARGIN):
+        # points within radius of center that are out of view, the view grown by margin
+        view = pygame.FRect(0, 0, WINDOW_WIDTH + margin * 2, WINDOW_HEIGHT + margin * 2)
+        view.center = center
+        left, top = self.cell((center[0] - radius, center[1] - radius))
+        right, bottom = self.cell((center[0] + radius, center[1] + radius))
+        found = []
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                for pos in self.cells.get((x, y), ()):
+                    if not view.collidepoint(pos) and (pos[0] - center[0]) ** 2 + (pos[1] - center[1]) ** 2 <= radius ** 2:
+                        found.append(pos)
+        return found
+
+class SpawnScheduler:
+    def __init__(self, game, waves = None):
+        # waves of enemies due on the game clock, spawned a few per update so that bursts are spread
+        # over frames, at points away from the player and out of view, dead enemies are respawned
+        self.game = game
+        self.waves = [Wave(*wave, list(game.enemy_frames)) for wave in (waves or config.waves())]
+        self.index = SpawnIndex()
+        self.wave = 0
+        self.spawned = 0
+        self.pending = 0
+        self.next_spawn = self.waves[0].delay + self.waves[0].interval
+        self.active = True
+
+    def stop(self):
+        self.active = False
+        self.pending = 0
+
+    def update(self):
+        if not self.active or self.wave == len(self.waves):
+            return
+        game, wave, now = self.game, self.waves[self.wave], game_time.get_ticks()
+        alive = len(game.enemy_sprites)
+
+        # a finished wave starts the next one once its last enemy is gone
+        if wave.total and self.spawned >= wave.total:
+            if not alive:
+                self.wave += 1
+                self.spawned = 0
+                if self.wave < len(self.waves):
+                    self.next_spawn = now + self.waves[self.wave].delay + self.waves[self.wave].interval
+            return
+
+        # spawns due since the last update, the timer waits while the wave is at its limit
+        while now >= self.next_spawn and alive + self.pending < wave.alive and (not wave.total or self.spawned + self.pending < wave.total):
+            self.pending += 1
+            self.next_spawn += wave.interval
+        if now >= self.next_spawn:
+            self.next_spawn = now + wave.interval
+
+        if self.pending:
+            self.spawn(wave)
+
+    def spawn(self, wave):
+        game = self.game
+        points = self.index.around(game.player.rect.center)
+        if not points:
+            return
+
+        # points no enemy spawned at are preferred
+        occupied = {enemy.spawn_pos for enemy in game.enemy_sprites}
+        available = [pos for pos in points if pos not in occupied] or points
+        for _ in range(min(self.pending, SPAWNS_PER_FRAME)):
+            enemy_type = rng.choice(wave.types)
+            pos = rng.choice(available)
+            if len(available) > 1:
+                available.remove(pos)
+            enemy = game.enemy_pool.spawn(pos, game.enemy_frames[enemy_type], game.enemy_masks[enemy_type])
+            if game.batch:
+                game.batch.add_enemy(enemy)
+            self.pending -= 1
+            self.spawned += 1
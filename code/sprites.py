@@ -1,13 +1,10 @@
 from settings import * 
+from assets import assets
+from rotation import RotationCache
+from timing import game_time, rng
+from config import config
+from pool import PooledSprite
 from math import atan2, degrees
-from random import randint
-
-class Sprite(pygame.sprite.Sprite):
-    def __init__(self, pos, surf, groups):
-        super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_frect(topleft = pos)
-        self.ground = True
 
 class CollisionSprite(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups):
@@ -19,17 +16,18 @@ class Gun(pygame.sprite.Sprite):
     def __init__(self, player, groups):
         # player connection
         self.player = player
-        self.distance = 70  # REDUCED FROM 140 to 70
+        self.archetype = config.archetype('gun')
         self.player_direction = pygame.Vector2(0,1)
 
         # sprite setup 
         super().__init__(groups)
-        self.gun_surf = pygame.image.load(join('images', 'gun', 'gun.png')).convert_alpha()
+        self.gun_surf = assets.image(join('images', 'gun', 'gun.png'))
+        self.rotations = RotationCache(self.gun_surf)
         self.image = self.gun_surf
-        self.rect = self.image.get_frect(center = self.player.rect.center + self.player_direction * self.distance)
+        self.rect = self.image.get_frect(center = self.player.rect.center + self.player_direction * self.archetype.distance)
 
     def get_direction(self):
-        mouse_pos = pygame.Vector2(pygame.mouse.get_pos())
+        mouse_pos = pygame.Vector2(self.player.controls.state.aim)
         player_pos = pygame.Vector2(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
         direction_vector = mouse_pos - player_pos
         if direction_vector.length() != 0:
@@ -40,68 +38,83 @@ class Gun(pygame.sprite.Sprite):
     def rotate_gun(self):
         angle = degrees(atan2(self.player_direction.x, self.player_direction.y)) - 90
         if self.player_direction.x > 0:
-            self.image = pygame.transform.rotozoom(self.gun_surf, angle, 1)
+            self.image = self.rotations.get(angle)
         else:
-            self.image = pygame.transform.rotozoom(self.gun_surf, abs(angle), 1)
-            self.image = pygame.transform.flip(self.image, False, True)
+            self.image = self.rotations.get(abs(angle), flip = True)
         
-        # Get new rect for rotated image but keep the center position
-        old_center = self.rect.center
-        self.rect = self.image.get_frect()
-        self.rect.center = old_center
+        # Resize the rect for the rotated image, update puts the center back
+        self.rect.size = self.image.get_size()
 
     def update(self, _):
         self.get_direction()
         self.rotate_gun()
         # Ensure the gun stays at a consistent distance from player
-        self.rect.center = self.player.rect.center + self.player_direction * self.distance
+        self.rect.center = self.player.rect.center + self.player_direction * self.archetype.distance
+
 
+class Bullet(PooledSprite):
+    __slots__ = ('archetype', 'mask', 'spawn_time', 'direction', 'previous')
 
-class Bullet(pygame.sprite.Sprite):
-    def __init__(self, surf, pos, direction, groups):
+    def __init__(self, surf, mask, pos, direction, groups, archetype = None):
         super().__init__(groups)
+        self.archetype = archetype or config.archetype('bullet')
+        self.reset(surf, mask, pos, direction)
+
+    def reset(self, surf, mask, pos, direction):
         self.image = surf 
+        self.mask = mask
         self.rect = self.image.get_frect(center = pos)
-        self.spawn_time = pygame.time.get_ticks()
-        self.lifetime = 1000
-
+        self.previous = self.rect.center
+        self.spawn_time = game_time.get_ticks()
         self.direction = direction 
-        self.speed = 1200 
-    
+
     def update(self, dt):
-        self.rect.center += self.direction * self.speed * dt
+        # batched bullets are moved and expired by their store
+        if self.store is None:
+            # the collision pass sweeps the bullet from where it was to where it is now
+            self.previous = self.rect.center
+            self.rect.center += self.direction * self.archetype.speed * dt
 
-        if pygame.time.get_ticks() - self.spawn_time >= self.lifetime:
-            self.kill()
+            if game_time.get_ticks() - self.spawn_time >= self.archetype.lifetime:
+                self.kill()
+
+class Enemy(PooledSprite):
+    __slots__ = ('archetype', 'player', 'flow_field', 'collision_grid', 'frames', 'frame_index',
+                 'masks', 'mask', 'spawn_pos', 'hitbox_rect', 'direction', 'death_time')
 
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, pos, frames, groups, player, collision_sprites):
+    def __init__(self, pos, frames, masks, groups, player, collision_grid, flow_field = None, archetype = None):
         super().__init__(groups)
+        self.archetype = archetype or config.archetype('enemy')
         self.player = player
+        self.flow_field = flow_field
+        self.collision_grid = collision_grid
+        self.reset(pos, frames, masks)
 
+    def reset(self, pos, frames, masks):
         # image 
         self.frames, self.frame_index = frames, 0 
+        self.masks = masks
         self.image = self.frames[self.frame_index]
-        self.animation_speed = 6
+        self.mask = self.masks[self.frame_index]
 
         # rect 
+        self.spawn_pos = pos
         self.rect = self.image.get_frect(center = pos)
-        self.hitbox_rect = self.rect.inflate(-20,-40)
-        self.collision_sprites = collision_sprites
+        self.hitbox_rect = self.rect.inflate(self.archetype.hitbox)
         self.direction = pygame.Vector2()
-        self.speed = 200
 
         # timer 
         self.death_time = 0
-        self.death_duration = 400
-    
+
     def animate(self, dt):
-        self.frame_index += self.animation_speed * dt
+        self.frame_index += self.archetype.animation_speed * dt
         self.image = self.frames[int(self.frame_index) % len(self.frames)]
+        self.mask = self.masks[int(self.frame_index) % len(self.masks)]
 
     def move(self, dt):
-        # get direction 
-        player_pos = pygame.Vector2(self.player.rect.center)
+        # get direction, around obstacles along the flow field and straight at the player once close
+        target = self.flow_field.target(self.rect.center) if self.flow_field else None
+        player_pos = pygame.Vector2(target or self.player.rect.center)
         enemy_pos = pygame.Vector2(self.rect.center)
         direction_vector = player_pos - enemy_pos
         if direction_vector.length() != 0:
@@ -110,14 +123,18 @@ class Enemy(pygame.sprite.Sprite):
             self.direction = pygame.Vector2()
 
         # update the rect position + collision
-        self.hitbox_rect.x += self.direction.x * self.speed * dt
-        self.collision('horizontal')
-        self.hitbox_rect.y += self.direction.y * self.speed * dt
-        self.collision('vertical')
+        self.step(self.direction * self.archetype.speed * dt)
+
+    def step(self, velocity):
+        obstacles = self.collision_grid.query(self.hitbox_rect.union(self.hitbox_rect.move(velocity)))
+        self.hitbox_rect.x += velocity.x
+        self.collision('horizontal', obstacles)
+        self.hitbox_rect.y += velocity.y
+        self.collision('vertical', obstacles)
         self.rect.center = self.hitbox_rect.center
 
-    def collision(self, direction):
-        for sprite in self.collision_sprites:
+    def collision(self, direction, obstacles):
+        for sprite in obstacles:
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0: self.hitbox_rect.right = sprite.rect.left
@@ -127,27 +144,36 @@ class Enemy(pygame.sprite.Sprite):
                     if self.direction.y > 0: self.hitbox_rect.bottom = sprite.rect.top
 
     def destroy(self):
+        if self.store is not None:
+            self.store.remove(self)
         # start a timer 
-        self.death_time = pygame.time.get_ticks()
+        self.death_time = game_time.get_ticks()
         # change the image 
-        surf = pygame.mask.from_surface(self.frames[0]).to_surface()
+        surf = self.masks[0].to_surface()
         surf.set_colorkey('black')
         self.image = surf
+        self.mask = self.masks[0]
     
     def death_timer(self):
-        if pygame.time.get_ticks() - self.death_time >= self.death_duration:
+        if game_time.get_ticks() - self.death_time >= self.archetype.death_duration:
             self.kill()
 
     def update(self, dt):
         if self.death_time == 0:
-            self.move(dt)
-            self.animate(dt)
+            # batched enemies are moved and animated by their store
+            if self.store is None:
+                self.move(dt)
+                self.animate(dt)
         else:
             self.death_timer()
 
 class Tiger(pygame.sprite.Sprite):
-    def __init__(self, pos, images, groups, collision_sprites,growl_sound=None):
+    __slots__ = ('archetype', 'caged_image', 'uncaged_image', 'is_caged', 'hitbox_rect', 'collision_grid', 'direction',
+                 'direction_change_time', 'growl_sound')
+
+    def __init__(self, pos, images, groups, collision_grid, growl_sound=None, archetype=None):
         super().__init__(groups)
+        self.archetype = archetype or config.archetype('tiger')
         # Load images
         self.caged_image = images['caged']
         self.uncaged_image = images['uncaged']
@@ -158,15 +184,13 @@ class Tiger(pygame.sprite.Sprite):
         self.rect = self.image.get_frect(center=pos)
         
         # Movement properties
-        self.hitbox_rect = self.rect.inflate(-20, -20)
-        self.collision_sprites = collision_sprites
+        self.hitbox_rect = self.rect.inflate(self.archetype.hitbox)
+        self.collision_grid = collision_grid
         self.direction = pygame.Vector2(0, 0)
-        self.speed = 100  # Slower than enemies
         
         # Timer for changing direction
         self.direction_change_time = 0
         self.growl_sound = growl_sound
-        self.direction_change_cooldown = 2000  # Change direction every 2 seconds
         
     def uncage(self):
         if self.is_caged:
@@ -179,26 +203,28 @@ class Tiger(pygame.sprite.Sprite):
                 self.growl_sound.play()
     def change_direction(self):
         # Random direction
-        angle = randint(0, 360)
+        angle = rng.randint(0, 360)
         self.direction = pygame.Vector2(pygame.math.Vector2(1, 0).rotate(angle).normalize())
     
     def move(self, dt):
         if not self.is_caged:
             # Check if it's time to change direction
-            current_time = pygame.time.get_ticks()
-            if current_time - self.direction_change_time >= self.direction_change_cooldown:
+            current_time = game_time.get_ticks()
+            if current_time - self.direction_change_time >= self.archetype.turn_interval:
                 self.change_direction()
                 self.direction_change_time = current_time
             
             # Move the tiger
-            self.hitbox_rect.x += self.direction.x * self.speed * dt
-            self.collision('horizontal')
-            self.hitbox_rect.y += self.direction.y * self.speed * dt
-            self.collision('vertical')
+            velocity = self.direction * self.archetype.speed * dt
+            obstacles = self.collision_grid.query(self.hitbox_rect.union(self.hitbox_rect.move(velocity)))
+            self.hitbox_rect.x += velocity.x
+            self.collision('horizontal', obstacles)
+            self.hitbox_rect.y += velocity.y
+            self.collision('vertical', obstacles)
             self.rect.center = self.hitbox_rect.center
     
-    def collision(self, direction):
-        for sprite in self.collision_sprites:
+    def collision(self, direction, obstacles):
+        for sprite in obstacles:
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0: self.hitbox_rect.right = sprite.rect.left
@@ -216,12 +242,13 @@ class Tiger(pygame.sprite.Sprite):
 
 
 class ScrollSprite(pygame.sprite.Sprite):
-    def __init__(self, pos, image, groups, text,title,idx):
+    __slots__ = ('scroll_id',)
+
+    def __init__(self, pos, image, groups, idx):
+        # the title and text are read from the config when the scroll is opened
         super().__init__(groups)
         self.image = image
         self.rect = self.image.get_rect(topleft=pos)
-        self.text = text 
-        self.title = title
         self.scroll_id = idx
 
         
@@ -0,0 +1,186 @@
+from settings import * 
+from ground import GroundChunks
+from sprites import CollisionSprite, ScrollSprite, Tiger
+from config import config
+
+class Region:
+    def __init__(self, key, size):
+        # map data of one square of the world, kept while its sprites are unloaded
+        self.key = key
+        self.area = pygame.FRect(key[0] * size, key[1] * size, size, size)
+        self.bounds = self.area.copy()
+        self.chunks = []
+        self.objects = []
+        self.collisions = []
+        self.scrolls = []
+        self.spawn_points = []
+
+        # (center, caged, direction, direction change time) of the tigers stored here
+        self.tigers = []
+
+        # sprites instantiated while the region is loaded
+        self.sprites = []
+        self.loaded = False
+
+class WorldStreamer:
+    def __init__(self, map, game, streaming = STREAM_WORLD):
+        # splits the map into regions, only the regions near the player have sprites,
+        # the others keep their map data and the state of what was changed in them
+        self.game = game
+        self.streaming = streaming
+        self.region_size = REGION_SIZE * TILE_SIZE
+        self.regions = {}
+        self.loaded = {}
+        self.collected = set()
+        self.overhang = 0
+
+        self.ground = GroundChunks(map.get_layer_by_name('Ground').tiles(), baked = False)
+        chunks_per_region = REGION_SIZE // CHUNK_SIZE
+        for key in self.ground.tiles:
+            self.region((key[0] // chunks_per_region, key[1] // chunks_per_region)).chunks.append(key)
+
+        for obj in map.get_layer_by_name('Objects'):
+            rect = obj.image.get_frect(topleft = (obj.x, obj.y))
+            self.extend(self.region_at((obj.x, obj.y)), rect).objects.append(((obj.x, obj.y), obj.image))
+        for obj in map.get_layer_by_name('Collisions'):
+            rect = pygame.FRect(obj.x, obj.y, obj.width, obj.height)
+            self.extend(self.region_at((obj.x, obj.y)), rect).collisions.append(((obj.x, obj.y), (obj.width, obj.height)))
+
+        self.player_pos = None
+        self.scroll_count = 0
+        for obj in map.get_layer_by_name('Entities'):
+            pos = (obj.x, obj.y)
+            if obj.name == 'Player':
+                self.player_pos = pos
+            elif obj.name == 'Enemy':
+                self.region_at(pos).spawn_points.append(pos)
+            elif obj.name == 'Scroll':
+                if self.scroll_count < config.scroll_count():
+                    self.scroll_count += 1  # Scroll ID (1-5)
+                    self.extend(self.region_at(pos), game.scroll_surf.get_frect(topleft = pos)).scrolls.append((pos, self.scroll_count))
+            elif obj.name == 'Tiger':
+                self.extend(self.region_at(pos), game.tiger_images['caged'].get_frect(center = pos)).tigers.append((pos, True, (0, 0), 0))
+
+    def key(self, pos):
+        return int(pos[0] // self.region_size), int(pos[1] // self.region_size)
+
+    def region(self, key):
+        if key not in self.regions:
+            self.regions[key] = Region(key, self.region_size)
+        return self.regions[key]
+
+    def region_at(self, pos):
+        return self.region(self.key(pos))
+
+    def extend(self, region, rect):
+        # sprites can reach past their region, the bounds decide when it is in view
+        region.bounds.union_ip(rect)
+        area, bounds = region.area, region.bounds
+        self.overhang = max(self.overhang, area.left - bounds.left, area.top - bounds.top,
+                            bounds.right - area.right, bounds.bottom - area.bottom)
+        return region
+
+    def nearby(self, rect):
+        # regions whose bounds overlap rect, only the keys rect and the overhang can reach are looked up
+        left, top = self.key((rect.left - self.overhang, rect.top - self.overhang))
+        right, bottom = self.key((rect.right + self.overhang, rect.bottom + self.overhang))
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                region = self.regions.get((x, y))
+                if region and region.bounds.colliderect(rect):
+                    yield region
+
+    def obstacles(self, rect):
+        # static obstacles of the regions reaching rect, loaded or not, for the flow field window
+        for region in self.nearby(rect):
+            for pos, image in region.objects:
+                yield image.get_frect(topleft = pos)
+            for pos, size in region.collisions:
+                yield pygame.FRect(pos, size)
+
+    def start(self, center):
+        if self.streaming:
+            self.update(center, len(self.regions))
+        else:
+            for region in list(self.regions.values()):
+                self.load(region)
+
+    def update(self, center, budget = REGION_LOADS_PER_FRAME):
+        if not self.streaming:
+            return
+        view = pygame.FRect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        view.center = center
+
+        keep = view.inflate(REGION_UNLOAD_MARGIN * 2, REGION_UNLOAD_MARGIN * 2)
+        for region in [region for region in self.loaded.values() if not region.bounds.colliderect(keep)]:
+            self.unload(region)
+        self.store_strays()
+
+        # regions in view load at once, the ones ahead of the player a few per update, closest first
+        ahead = view.inflate(REGION_LOAD_MARGIN * 2, REGION_LOAD_MARGIN * 2)
+        missing = [region for region in self.nearby(ahead) if not region.loaded]
+        missing.sort(key = lambda region: pygame.Vector2(center).distance_squared_to(region.area.center))
+        for region in missing:
+            if budget > 0 or region.bounds.colliderect(view):
+                self.load(region)
+                budget -= 1
+
+    def load(self, region):
+        game = self.game
+        for key in region.chunks:
+            self.ground.bake(key)
+        for pos, image in region.objects:
+            sprite = CollisionSprite(pos, image, game.all_sprites)
+            game.collision_grid.insert(sprite)
+            region.sprites.append(sprite)
+        # invisible walls belong to no group, the collision grid is all that collides with them
+        for pos, size in region.collisions:
+            sprite = CollisionSprite(pos, pygame.Surface(size), ())
+            game.collision_grid.insert(sprite)
+            region.sprites.append(sprite)
+        for pos, scroll_id in region.scrolls:
+            if scroll_id not in self.collected:
+                region.sprites.append(ScrollSprite(pos, game.scroll_surf, (game.all_sprites, game.scroll_sprites), scroll_id))
+
+        # tigers are not owned by a region while loaded, they can walk into the next one
+        for center, caged, direction, direction_change_time in region.tigers:
+            tiger = Tiger(center, game.tiger_images, (game.all_sprites, game.tiger_sprites), game.collision_grid, game.tiger_growl)
+            if not caged:
+                tiger.is_caged = False
+                tiger.image = tiger.uncaged_image
+                tiger.direction.update(direction)
+                tiger.direction_change_time = direction_change_time
+        region.tigers = []
+
+        game.spawner.index.add(region.spawn_points)
+        region.loaded = True
+        self.loaded[region.key] = region
+
+    def unload(self, region):
+        game = self.game
+        for key in region.chunks:
+            self.ground.unload(key)
+        for sprite in region.sprites:
+            if sprite in game.collision_grid.order:
+                game.collision_grid.remove(sprite)
+            sprite.kill()
+        region.sprites = []
+        game.spawner.index.remove(region.spawn_points)
+
+        # enemies left behind go back to their pool, they respawn near the player
+        for enemy in [enemy for enemy in game.enemy_sprites if self.key(enemy.rect.center) == region.key]:
+            enemy.kill()
+
+        region.loaded = False
+        del self.loaded[region.key]
+
+    def store_strays(self):
+        # tigers outside the loaded regions are stored in the region they are in
+        for tiger in [tiger for tiger in self.game.tiger_sprites if self.key(tiger.rect.center) not in self.loaded]:
+            region = self.extend(self.region_at(tiger.rect.center), tiger.rect)
+            region.tigers.append((tiger.rect.center, tiger.is_caged, tuple(tiger.direction), tiger.direction_change_time))
+            tiger.kill()
+
+    def collect(self, scroll):
+        # collected scrolls stay gone when their region is loaded again
+        self.collected.add(scroll.scroll_id)
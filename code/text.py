@@ -0,0 +1,29 @@
+from settings import * 
+from collections import OrderedDict
+
+class TextCache:
+    def __init__(self, max_surfaces = TEXT_CACHE_SIZE):
+        # fonts live for the whole session, rendered surfaces are evicted least recently used first
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.max_surfaces = max_surfaces
+
+    def font(self, size, name = None):
+        if (name, size) not in self.fonts:
+            self.fonts[(name, size)] = pygame.font.Font(name, size)
+        return self.fonts[(name, size)]
+
+    def cached(self, key, build):
+        # any surface that is expensive to build, rendered text or a pre-composited overlay
+        surf = self.surfaces.get(key)
+        if surf is None:
+            surf = build()
+            self.surfaces[key] = surf
+            if len(self.surfaces) > self.max_surfaces:
+                self.surfaces.popitem(last = False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surf
+
+    def render(self, font, text, color):
+        return self.cached((font, text, tuple(color)), lambda: font.render(text, True, color))
@@ -0,0 +1,21 @@
+from random import Random
+
+class GameTime:
+    def __init__(self):
+        # milliseconds of simulated play, advanced by every update step
+        # so timers behave the same at any frame rate or in headless runs
+        self.time = 0
+
+    def reset(self):
+        self.time = 0
+
+    def advance(self, dt):
+        self.time += dt * 1000
+
+    def get_ticks(self):
+        return self.time
+
+game_time = GameTime()
+
+# every random choice of the simulation, seeded per game so recorded sessions replay exactly
+rng = Random()